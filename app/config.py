@@ -0,0 +1,143 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (primarily for local development)
+load_dotenv()
+
+# --- Firestore / Firebase Admin executor ---
+# The Firebase Admin SDK is synchronous, so every call is run on a bounded thread pool
+# instead of on the event loop. Workers bound concurrent round-trips; the queue bounds
+# how many calls may wait for a worker before new ones are rejected with a 503.
+FIRESTORE_EXECUTOR_WORKERS = int(os.getenv("FIRESTORE_EXECUTOR_WORKERS", "16"))
+FIRESTORE_EXECUTOR_MAX_QUEUE = int(os.getenv("FIRESTORE_EXECUTOR_MAX_QUEUE", "256"))
+
+# --- Admin user-detail view ---
+# Per-call timeout for each of the concurrent lookups behind GET /admin/users/{user_id}
+ADMIN_DETAIL_CALL_TIMEOUT_SECONDS = float(os.getenv("ADMIN_DETAIL_CALL_TIMEOUT_SECONDS", "5"))
+
+# --- Admin export ---
+# GET /admin/export: students without a summary are joined from the source collections,
+# at most this many at once (three queries each)
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "16"))
+
+# --- Caches ---
+# "memory" keeps one LRU per worker process; "redis" shares entries across workers (needs the redis package)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Latest plan per user, served by GET /student/plan and refreshed by POST /student/plan
+PLAN_CACHE_TTL_SECONDS = float(os.getenv("PLAN_CACHE_TTL_SECONDS", "300"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "10000"))
+# Plan ID -> owner cache for the feedback existence/ownership check
+PLAN_OWNER_CACHE_TTL_SECONDS = float(os.getenv("PLAN_OWNER_CACHE_TTL_SECONDS", "3600"))
+PLAN_OWNER_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_OWNER_CACHE_MAX_ENTRIES", "50000"))
+# TTL for "plan not found" entries
+PLAN_OWNER_NEGATIVE_TTL_SECONDS = float(os.getenv("PLAN_OWNER_NEGATIVE_TTL_SECONDS", "30"))
+# Summary version per user, so conditional GETs can be answered without reading the summary
+SUMMARY_VERSION_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_VERSION_CACHE_TTL_SECONDS", "300"))
+SUMMARY_VERSION_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_VERSION_CACHE_MAX_ENTRIES", "10000"))
+# ETag of the last GET /admin/users/{user_id} response per user and the summary version it was built from.
+# Also bounds how long a Firebase Auth profile change can go unnoticed by a revalidating client.
+USER_DETAIL_ETAG_CACHE_TTL_SECONDS = float(os.getenv("USER_DETAIL_ETAG_CACHE_TTL_SECONDS", "60"))
+USER_DETAIL_ETAG_CACHE_MAX_ENTRIES = int(os.getenv("USER_DETAIL_ETAG_CACHE_MAX_ENTRIES", "10000"))
+
+# --- Idempotency ---
+# POST /student/{input,plan,feedback} with an Idempotency-Key header: the first successful response
+# per user and key is replayed to retries for this long (shared across workers with CACHE_BACKEND=redis)
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_CACHE_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_CACHE_MAX_ENTRIES", "50000"))
+
+# --- Authentication ---
+SECRET_KEY = os.getenv("SECRET_KEY", "a_very_secret_key_please_change_me") # CHANGE THIS!
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# "jose" (python-jose) or "native" (built-in HS256 verifier, several times cheaper per token)
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose")
+# Verified bearer tokens are cached until their own expiry; this bounds how many are kept
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# How long a user's Firebase custom claims (the "admin" role) are trusted before being re-read
+ADMIN_CLAIMS_TTL_SECONDS = float(os.getenv("ADMIN_CLAIMS_TTL_SECONDS", "300"))
+
+# --- Background jobs ---
+# Only the in-process "local" broker exists today; jobs live in the worker process that accepted them
+JOB_BROKER = os.getenv("JOB_BROKER", "local")
+PLAN_JOB_WORKERS = int(os.getenv("PLAN_JOB_WORKERS", "4"))
+PLAN_JOB_MAX_QUEUE = int(os.getenv("PLAN_JOB_MAX_QUEUE", "100"))
+# How long a finished plan-generation job can still be polled for its result
+PLAN_JOB_RESULT_TTL_SECONDS = float(os.getenv("PLAN_JOB_RESULT_TTL_SECONDS", "3600"))
+# Longest a plan job holds its user's in-flight claim (shared by all workers) if its worker dies mid-job
+PLAN_JOB_CLAIM_TTL_SECONDS = float(os.getenv("PLAN_JOB_CLAIM_TTL_SECONDS", "600"))
+
+# --- Plan generation ---
+# Plan generator backend: "stub" (deterministic local plan; the model-backed generator is not wired yet)
+PLAN_GENERATOR = os.getenv("PLAN_GENERATOR", "stub")
+# Artificial delay before each plan section from the stub, to approximate a model for streaming benchmarks
+PLAN_STUB_SECTION_DELAY_MS = float(os.getenv("PLAN_STUB_SECTION_DELAY_MS", "0"))
+
+# --- Batch writes ---
+# Upper bound on items accepted by POST /student/{input,feedback}/batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+# Documents per Firestore WriteBatch commit (Firestore allows at most 500 writes per commit)
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "500"))
+
+# --- Feedback write-behind ---
+# When enabled, POST /student/feedback hands validated documents to an in-process buffer that
+# writes them, with their summary updates, in one transaction every FEEDBACK_FLUSH_INTERVAL_MS or
+# FEEDBACK_FLUSH_MAX_DOCS documents, instead of one transaction per request
+FEEDBACK_WRITE_BEHIND = os.getenv("FEEDBACK_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+FEEDBACK_FLUSH_INTERVAL_MS = float(os.getenv("FEEDBACK_FLUSH_INTERVAL_MS", "50"))
+# Each document costs up to three writes (document, summary, plan counter); keep below 500 / 3
+FEEDBACK_FLUSH_MAX_DOCS = int(os.getenv("FEEDBACK_FLUSH_MAX_DOCS", "150"))
+# Buffered documents beyond this are rejected with a 503
+FEEDBACK_BUFFER_MAX_PENDING = int(os.getenv("FEEDBACK_BUFFER_MAX_PENDING", "5000"))
+# true: a request returns once its batch is committed (errors reach the client);
+# false: it returns as soon as the document is buffered (lost if the process dies first)
+FEEDBACK_DURABLE_ACK = os.getenv("FEEDBACK_DURABLE_ACK", "true").lower() in ("1", "true", "yes")
+
+# --- Storage ---
+# "firestore" (Firestore + Firebase Auth) or "memory" (in-process, for local runs and load tests)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firestore")
+# Artificial per-call latency for the memory backend, to approximate Firestore round-trips
+MEMORY_STORAGE_LATENCY_MS = float(os.getenv("MEMORY_STORAGE_LATENCY_MS", "0"))
+
+# --- Metrics ---
+# Records per-route request latency and per-call storage latency, exposed at GET /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# When set, GET /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# --- Serialization ---
+# Encode handler results directly (pydantic's serializer for models, orjson for dicts) instead of
+# re-validating them against response_model; "false" restores FastAPI's standard path
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "true").lower() == "true"
+
+# --- Admin stats ---
+# Counter shards behind GET /admin/stats; more shards allow more concurrent writes, each read
+# fetches all of them. Only ever increase this: counts in shards beyond it are no longer read.
+STATS_SHARDS = int(os.getenv("STATS_SHARDS", "10"))
+
+# --- Serving ---
+# Make the first Firestore and Firebase Auth round-trips during startup, before the worker accepts traffic
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "true").lower() == "true"
+
+# --- Admission control ---
+# Per-user token buckets and concurrency limits, plus a per-route concurrency limit, for the
+# expensive routes. Requests over a limit wait (bounded queue, bounded time) or are shed with
+# 429 (the user's own limits) / 503 (route at capacity). Values <= 0 disable a limit.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_WAITING = int(os.getenv("ADMISSION_MAX_WAITING", "100")) # Waiters per route
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "2"))
+# POST /student/plan (queues AI plan generation)
+PLAN_RATE_PER_MINUTE = float(os.getenv("PLAN_RATE_PER_MINUTE", "10"))
+PLAN_BURST = float(os.getenv("PLAN_BURST", "5"))
+PLAN_USER_CONCURRENCY = int(os.getenv("PLAN_USER_CONCURRENCY", "2"))
+PLAN_ROUTE_CONCURRENCY = int(os.getenv("PLAN_ROUTE_CONCURRENCY", "64"))
+# GET /admin/users (Firebase Auth listing)
+ADMIN_USERS_RATE_PER_MINUTE = float(os.getenv("ADMIN_USERS_RATE_PER_MINUTE", "60"))
+ADMIN_USERS_BURST = float(os.getenv("ADMIN_USERS_BURST", "10"))
+ADMIN_USERS_USER_CONCURRENCY = int(os.getenv("ADMIN_USERS_USER_CONCURRENCY", "2"))
+ADMIN_USERS_ROUTE_CONCURRENCY = int(os.getenv("ADMIN_USERS_ROUTE_CONCURRENCY", "8"))
+# GET /admin/export (walks every user)
+EXPORT_RATE_PER_MINUTE = float(os.getenv("EXPORT_RATE_PER_MINUTE", "6"))
+EXPORT_BURST = float(os.getenv("EXPORT_BURST", "2"))
+EXPORT_USER_CONCURRENCY = int(os.getenv("EXPORT_USER_CONCURRENCY", "1"))
+EXPORT_ROUTE_CONCURRENCY = int(os.getenv("EXPORT_ROUTE_CONCURRENCY", "2"))
@@ -0,0 +1,60 @@
+"""Gunicorn settings for multi-process serving (used by backend/Procfile).
+
+    gunicorn -c app/gunicorn_conf.py app.main:app
+
+Every worker is a separate process with its own event loop, Firestore executor and job
+queue. With shared state (CACHE_BACKEND=redis, and Firestore for plan jobs and their per-user
+claims) there is one worker per available core; otherwise a single worker, as per-worker
+caches would serve stale plans. The Firebase Admin SDK's gRPC channels are not fork-safe,
+so the app is NOT preloaded in the master: each worker imports it after fork, and its
+lifespan creates the Firebase clients and warms them up before accepting connections.
+
+Keep this module free of app imports; it is loaded by the gunicorn master.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv() # The same .env the app reads, for the settings checked below
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: the CPU affinity mask, capped by a cgroup v2 CPU quota (containers)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError: # Not available on macOS
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# One async worker per core; each already overlaps I/O on its event loop and executor threads.
+# Only with shared caches and job state: with per-worker caches a worker can serve a plan another
+# worker has replaced (and 304 its ETag). WEB_CONCURRENCY overrides (it is also what uvicorn
+# --workers defaults to); ALLOW_PER_WORKER_STATE=true skips the check (benchmarks/scaling.py,
+# which drives stateless routes only).
+shared_state = (
+    os.getenv("CACHE_BACKEND", "memory") == "redis" and os.getenv("STORAGE_BACKEND", "firestore") == "firestore"
+)
+workers = int(os.getenv("WEB_CONCURRENCY", available_cpus() if shared_state else 1))
+if workers > 1 and not shared_state and os.getenv("ALLOW_PER_WORKER_STATE", "false").lower() != "true":
+    raise RuntimeError(
+        f"WEB_CONCURRENCY={workers} needs CACHE_BACKEND=redis and STORAGE_BACKEND=firestore "
+        "(shared caches and plan jobs); use a single worker otherwise"
+    )
+preload_app = False # Firebase clients must be created after fork, in each worker
+timeout = 60
+graceful_timeout = 30 # Lets in-flight requests and the lifespan shutdown finish on deploys
+keepalive = 5
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} forked; it initializes and warms up its own Firebase clients")
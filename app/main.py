@@ -1,81 +1,119 @@
+import time
+_import_started = time.perf_counter() # First, so the startup report covers every import below
+
+import asyncio
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
-import json # Added for parsing JSON string from env var
-
-# Load environment variables from .env file (primarily for local development)
-load_dotenv()
-
-# --- Firebase Admin SDK Initialization ---
-try:
-    firebase_service_account_json_str = os.getenv("FIREBASE_SERVICE_ACCOUNT_KEY_JSON")
-    if firebase_service_account_json_str:
-        # Load from environment variable (for Railway)
-        service_account_info = json.loads(firebase_service_account_json_str)
-        cred = credentials.Certificate(service_account_info)
-        print("Initializing Firebase Admin SDK from environment variable.")
-    else:
-        # Load from local file (for local development)
-        cred_path = os.path.join(os.path.dirname(__file__), "..", "firebase-service-account-key.json")
-        if not os.path.exists(cred_path):
-            raise FileNotFoundError(f"Firebase service account key file not found at {cred_path} and FIREBASE_SERVICE_ACCOUNT_KEY_JSON env var is not set.")
-        cred = credentials.Certificate(cred_path)
-        print("Initializing Firebase Admin SDK from local file.")
-
-    if not firebase_admin._apps:
-        firebase_admin.initialize_app(cred)
-        print("Firebase Admin SDK initialized successfully.")
-    else:
-        print("Firebase Admin SDK already initialized.")
-    db = firestore.client() # Firestore client instance
-except Exception as e:
-    print(f"Error initializing Firebase Admin SDK: {e}")
-    db = None # Set db to None if initialization fails
-# --- End Firebase Initialization ---
+from fastapi.responses import PlainTextResponse
+from . import config # Loads .env
 
 # Import route modules
 from .routes import auth as auth_router
 from .routes import student as student_router
 from .routes import admin as admin_router
+from .services import metrics, startup
+from .services.executor import executor
+from .services.cache import cache_stats
+from .services.jobs import broker_stats, shutdown_brokers
+from .services.admission import limiter_stats
+from .services.write_buffer import buffer_stats, flush_buffers
+from .storage.base import get_storage
+
+
+def _runtime_gauges() -> dict:
+    # Same state as GET /admin/runtime, flattened to numeric samples
+    components = {("executor", "firestore"): executor.stats()}
+    components.update({("cache", name): stats for name, stats in cache_stats().items()})
+    components.update({("jobs", name): stats for name, stats in broker_stats().items()})
+    components.update({("admission", name): stats for name, stats in limiter_stats().items()})
+    components.update({("write_buffer", name): stats for name, stats in buffer_stats().items()})
+    components[("startup", "app")] = startup.report()
+    return {
+        (component, name, stat): value
+        for (component, name), stats in components.items()
+        for stat, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+metrics.Gauge("runtime_state", "Executor, cache, job queue, admission, write buffer and startup state.", ("component", "name", "stat"), _runtime_gauges)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # --- Storage initialization ---
+    # Creates the one shared client (Firebase Admin SDK + Firestore in production) before the first
+    # request, in a thread so its imports and credential loading don't hold the event loop.
+    with startup.Timer("init"):
+        try:
+            storage = await asyncio.to_thread(get_storage)
+        except HTTPException:
+            storage = None # Already logged; requests get a 500 and retry the initialization
+    # Warm-up runs before this worker accepts connections, so no request pays for the first round-trips
+    if storage is not None and config.WARM_UP_ON_STARTUP:
+        with startup.Timer("warm_up"):
+            try:
+                await storage.warm_up()
+            except Exception as e:
+                print(f"Error warming up storage: {e}")
+    startup.ready()
+    yield
+    await flush_buffers() # Commits buffered feedback before the worker exits
+    await shutdown_brokers() # Cancels queued plan jobs; the executor's threads finish with the process
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="SURI AI Backend", version="0.1.0", lifespan=lifespan)
 
-app = FastAPI(title="SURI AI Backend", version="0.1.0")
-
-# CORS Configuration
-# Allow all origins for now, can be restricted later
-frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000") # Default for local dev
-origins = [
-    frontend_url,
-    "http://localhost:3000",
-    "http://localhost:3001", # In case port 3000 is busy
-    "http://localhost:5173",
-    "http://localhost:5174",
-]
-# Remove duplicates and empty strings if FRONTEND_URL is one of the defaults
-origins = list(set(filter(None, origins)))
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Root endpoint
-@app.get("/", tags=["Root"])
-async def read_root():
-    return {"message": "Welcome to the SURI AI Backend"}
-
-# Include routers from route modules
-app.include_router(auth_router.router, prefix="/auth", tags=["Authentication"])
-app.include_router(student_router.router, prefix="/student", tags=["Student"])
-app.include_router(admin_router.router, prefix="/admin", tags=["Admin"])
+    # CORS Configuration
+    # Allow all origins for now, can be restricted later
+    frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000") # Default for local dev
+    origins = [
+        frontend_url,
+        "http://localhost:3000",
+        "http://localhost:3001", # In case port 3000 is busy
+        "http://localhost:5173",
+        "http://localhost:5174",
+    ]
+    # Remove duplicates and empty strings if FRONTEND_URL is one of the defaults
+    origins = list(set(filter(None, origins)))
 
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Request latency per route template; added last so it is outermost and times the whole stack
+    if config.METRICS_ENABLED:
+        app.add_middleware(metrics.MetricsMiddleware)
+
+    # Root endpoint
+    @app.get("/", tags=["Root"])
+    async def read_root():
+        return {"message": "Welcome to the SURI AI Backend"}
+
+    # Prometheus scrape endpoint
+    @app.get("/metrics", include_in_schema=False)
+    async def read_metrics(request: Request):
+        if config.METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {config.METRICS_TOKEN}":
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    # Include routers from route modules
+    app.include_router(auth_router.router, prefix="/auth", tags=["Authentication"])
+    app.include_router(student_router.router, prefix="/student", tags=["Student"])
+    app.include_router(admin_router.router, prefix="/admin", tags=["Admin"])
+
+    return app
+
+
+app = create_app()
+startup.record("import", time.perf_counter() - _import_started)
 
 # Note: Uvicorn will run this app instance.
 # For Railway, the Procfile will handle the port using $PORT
 # Example local command: uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
-
@@ -37,6 +37,12 @@ class PlanInDB(PlanBase):
     class Config:
         from_attributes = True
 
+class PlanJob(BaseModel):
+    job_id: str
+    status: str # queued | running | succeeded | failed
+    plan: Optional[PlanInDB] = None # Set once the job has succeeded
+    error: Optional[str] = None # Set if the job failed
+
 class FeedbackBase(BaseModel):
     rating: int = Field(..., ge=1, le=5)
     comments: Optional[str] = None
@@ -52,3 +58,23 @@ class FeedbackInDB(FeedbackBase):
     class Config:
         from_attributes = True
 
+class PlanPage(BaseModel):
+    plans: List[PlanInDB] # Newest first
+    next_start_after: Optional[str] = None # Pass back as start_after to fetch the next page
+
+class FeedbackPage(BaseModel):
+    feedback: List[FeedbackInDB] # Newest first
+    next_start_after: Optional[str] = None # Pass back as start_after to fetch the next page
+
+
+class BatchItemResult(BaseModel):
+    index: int # Position of the item in the submitted list
+    status: str # created | rejected (failed validation, not written) | failed (write error)
+    id: Optional[str] = None # Document ID in Firebase, when created
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    created: int
+    rejected: int
+    failed: int
+    results: List[BatchItemResult]
@@ -25,6 +25,11 @@ class UserInDB(UserInDBBase):
 class UserPublic(UserInDBBase):
     pass
 
+# One page of the admin user listing
+class UserPage(BaseModel):
+    users: list[UserPublic]
+    next_page_token: str | None = None # Pass back as page_token to fetch the next page
+
 class Token(BaseModel):
     access_token: str
     token_type: str
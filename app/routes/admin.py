@@ -1,118 +1,323 @@
-from fastapi import APIRouter, Depends, HTTPException
-from firebase_admin import firestore, auth as firebase_auth
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 # Import models and auth dependency
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from models.user import UserPublic # Assuming UserPublic is suitable for listing
+from ..models.user import UserPublic, UserPage # Assuming UserPublic is suitable for listing
 from .auth import get_current_admin_user # Use the JWT-based admin dependency
+from .. import config
+from ..storage.base import FEEDBACK, INPUTS, PLANS, UserNotFoundError, get_storage
+from ..services.executor import executor
+from ..services import summaries # Per-student summary documents
+from ..services import stats # Incrementally maintained admin counters
+from ..services.cache import cache_stats, create_cache
+from ..services.jobs import broker_stats
+from ..services import startup
+from ..services.admission import admission, create_limiter, limiter_stats
+from ..services.write_buffer import buffer_stats
+from ..services.serialization import dumps, respond
+from ..services import export
+from ..services import conditional # ETag / If-None-Match
 
-# Get Firestore client (initialized in main.py)
-try:
-    db = firestore.client()
-    # Assuming you might store user details beyond Firebase Auth in a 'users' collection
-    users_collection = db.collection("users") 
-    # References to other collections needed for detailed view
-    inputs_collection = db.collection("student_inputs")
-    plans_collection = db.collection("student_plans")
-    feedback_collection = db.collection("student_feedback")
-except Exception as e:
-    print(f"Error getting Firestore client in admin.py: {e}")
-    db = None
+# Listing walks Firebase Auth page by page; cap how much of it each admin can run at once
+users_limiter = create_limiter(
+    "admin_users",
+    rate_per_minute=config.ADMIN_USERS_RATE_PER_MINUTE,
+    burst=config.ADMIN_USERS_BURST,
+    user_concurrency=config.ADMIN_USERS_USER_CONCURRENCY,
+    route_concurrency=config.ADMIN_USERS_ROUTE_CONCURRENCY,
+)
+
+# An export reads every student; one or two at a time is plenty
+export_limiter = create_limiter(
+    "admin_export",
+    rate_per_minute=config.EXPORT_RATE_PER_MINUTE,
+    burst=config.EXPORT_BURST,
+    user_concurrency=config.EXPORT_USER_CONCURRENCY,
+    route_concurrency=config.EXPORT_ROUTE_CONCURRENCY,
+)
+
+# User ID -> {"etag", "version"}: the last detail response's ETag and the summary version behind it,
+# so a revalidation is answered from the cached summary version without Auth or Firestore calls
+detail_etag_cache = create_cache(
+    "user_detail_etag", max_entries=config.USER_DETAIL_ETAG_CACHE_MAX_ENTRIES, ttl=config.USER_DETAIL_ETAG_CACHE_TTL_SECONDS,
+)
 
 router = APIRouter()
 
-@router.get("/users", response_model=list[UserPublic]) # Use UserPublic or a dedicated AdminUserView
-async def read_users(current_admin: dict = Depends(get_current_admin_user)):
-    """Retrieves a list of all users from Firebase Authentication (admin only)."""
-    if not db:
-        raise HTTPException(status_code=500, detail="Firestore client not initialized")
-        
-    users_list = []
+# Field projections for the detail view: only what the response uses is sent and decoded.
+# The summary's latest_plan is the full plan document, of which the view shows three fields.
+SUMMARY_DETAIL_FIELDS = [
+    "goals", "struggles", "plan_status", "recent_feedback", "last_feedback_rating", "version", "updated_at",
+    "latest_plan.id", "latest_plan.week", "latest_plan.theme",
+]
+INPUT_DETAIL_FIELDS = ["goals", "struggles"]
+PLAN_DETAIL_FIELDS = ["week", "theme"]
+FEEDBACK_DETAIL_FIELDS = ["plan_id", "rating", "comments", "created_at"]
+
+def _to_public_user(user_record) -> UserPublic:
+    # Emails come from Firebase Auth, which validated them at registration; re-running
+    # EmailStr validation per listed user dominated the listing's cost
+    build = UserPublic.model_construct if config.FAST_SERIALIZATION else UserPublic
+    return build(
+        id=user_record.uid,
+        email=user_record.email,
+        name=user_record.display_name or "N/A" # Use display_name from Auth
+        # Add other fields from Firestore if fetched
+    )
+
+@router.get("/users", response_model=UserPage) # Use UserPublic or a dedicated AdminUserView
+async def read_users(
+    page_size: int = Query(100, ge=1, le=1000), # Firebase Auth caps a page at 1000 users
+    page_token: str | None = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_admin: dict = Depends(admission(users_limiter, get_current_admin_user)),
+):
+    """Retrieves users from Firebase Authentication one page at a time (admin only).
+
+    format=json returns a single page plus the next_page_token to continue from.
+    format=ndjson streams every user from page_token onwards, one JSON object per line,
+    fetching page_size users at a time so server memory stays flat.
+    """
+    storage = get_storage()
+
+    async def fetch_page(token):
+        user_records, next_page_token = await storage.list_users(page_size, token)
+        return [_to_public_user(user_record) for user_record in user_records], next_page_token
+
     try:
-        # Iterate through all users in Firebase Auth
-        for user_record in firebase_auth.list_users().iterate_all():
-            # Optionally fetch additional details from Firestore 'users' collection if needed
-            # user_details_doc = users_collection.document(user_record.uid).get()
-            # user_details = user_details_doc.to_dict() if user_details_doc.exists else {}
-            users_list.append(
-                UserPublic(
-                    id=user_record.uid,
-                    email=user_record.email,
-                    name=user_record.display_name or "N/A" # Use display_name from Auth
-                    # Add other fields from Firestore if fetched
-                )
-            )
-        return users_list
+        users_list, next_page_token = await fetch_page(page_token)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error listing users from Firebase Auth: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve users: {e}")
 
-@router.get("/users/{user_id}", response_model=dict) # Using dict for flexibility in detailed view
-async def read_user_details(user_id: str, current_admin: dict = Depends(get_current_admin_user)):
-    """Retrieves detailed information for a specific user from Firebase Auth and Firestore (admin only)."""
-    if not db:
-        raise HTTPException(status_code=500, detail="Firestore client not initialized")
+    if format == "json":
+        return respond(UserPage(users=users_list, next_page_token=next_page_token))
+
+    async def stream_users(users_list, next_page_token):
+        # Only one page is held in memory at a time; the next one is fetched once it is written out
+        while True:
+            for user in users_list:
+                yield dumps(user) + b"\n"
+            if not next_page_token:
+                break
+            try:
+                users_list, next_page_token = await fetch_page(next_page_token)
+            except Exception as e:
+                # Headers are already sent, so the stream can only be cut short
+                print(f"Error streaming users from Firebase Auth: {e}")
+                break
+
+    return StreamingResponse(stream_users(users_list, next_page_token), media_type="application/x-ndjson")
+
+async def _fetch_sections(sections: dict, user_id: str) -> dict:
+    """Awaits independent lookups concurrently, each with its own timeout.
+
+    Returns {section: result}, where a failed or timed-out section holds its exception.
+    """
+    results = await asyncio.gather(
+        *(asyncio.wait_for(lookup, timeout=config.ADMIN_DETAIL_CALL_TIMEOUT_SECONDS) for lookup in sections.values()),
+        return_exceptions=True,
+    )
+    results = dict(zip(sections, results))
+    for section, result in results.items():
+        if isinstance(result, BaseException) and not isinstance(result, UserNotFoundError):
+            reason = "timeout" if isinstance(result, asyncio.TimeoutError) else repr(result)
+            print(f"Error fetching {section} details for {user_id}: {reason}")
+    return results
+
+def _detail_etag(user_id: str, user_record, summary: dict) -> str:
+    return conditional.make_etag(
+        user_id, summary.get("version", 0), summary.get("updated_at"),
+        user_record.email, user_record.display_name, user_record.email_verified, user_record.creation_timestamp,
+    )
+
+@router.get("/users/{user_id}", response_model=dict, responses={304: {"description": "User details unchanged since the given ETag"}}) # Using dict for flexibility in detailed view
+async def read_user_details(user_id: str, request: Request, response: Response, current_admin: dict = Depends(get_current_admin_user)):
+    """Retrieves detailed information for a specific user from Firebase Auth and Firestore (admin only).
+
+    The Auth lookup and the student_summaries read run concurrently, each with its own timeout.
+    Users without a summary yet fall back to querying the three source collections. A section
+    that fails or times out is listed under "degraded" instead of failing the whole page.
+
+    Complete summary-based responses carry an ETag. If-None-Match is checked first against the
+    cached summary version, so an unchanged user costs no reads; otherwise after the lookups,
+    still skipping serialization on a match.
+    """
+    storage = get_storage()
+
+    if request.headers.get("if-none-match"):
+        cached = await detail_etag_cache.get(user_id)
+        if (cached is not None and conditional.matches(request, cached["etag"])
+                and cached["version"] == await summaries.cached_version(user_id)):
+            return conditional.not_modified(cached["etag"])
+
+    results = await _fetch_sections({
+        "profile": storage.get_user(user_id), # Basic user info from Firebase Auth
+        "summary": summaries.get_summary(storage, user_id, SUMMARY_DETAIL_FIELDS), # Latest input, plan and feedback in one document
+    }, user_id)
+
+    user_record = results["profile"]
+    if isinstance(user_record, UserNotFoundError):
+        raise HTTPException(status_code=404, detail="User not found in Firebase Authentication")
+
+    summary = results.pop("summary")
+    if summary is None or isinstance(summary, BaseException):
+        # Not backfilled yet (or the summary read failed): query the source collections instead
+        summary = None
+        results.update(await _fetch_sections({
+            "input": storage.query_by_user(INPUTS, user_id, 1, fields=INPUT_DETAIL_FIELDS), # Latest student input
+            "plan": storage.query_by_user(PLANS, user_id, 1, fields=PLAN_DETAIL_FIELDS), # Latest plan
+            "feedback": storage.query_by_user(FEEDBACK, user_id, 5, fields=FEEDBACK_DETAIL_FIELDS), # Feedback history (limit for brevity)
+        }, user_id))
+
+    degraded = [section for section, result in results.items() if isinstance(result, BaseException)]
 
     try:
-        # 1. Get basic user info from Firebase Auth
-        user_record = firebase_auth.get_user(user_id)
         user_details = {
-            "id": user_record.uid,
-            "email": user_record.email,
-            "name": user_record.display_name or "N/A",
-            "registrationDate": user_record.user_metadata.creation_timestamp, # Timestamp might need formatting
-            "emailVerified": user_record.email_verified,
+            "id": user_id,
+            "email": None,
+            "name": "N/A",
+            "registrationDate": None,
+            "emailVerified": None,
             # Initialize other fields
             "goals": [],
             "struggles": "",
             "latestPlan": None,
-            "feedbackHistory": []
+            "feedbackHistory": [],
+            "degraded": degraded,
         }
-
-        # 2. Get latest student input from Firestore
-        input_query = inputs_collection.where("user_id", "==", user_id).order_by("created_at", direction=firestore.Query.DESCENDING).limit(1)
-        input_docs = input_query.stream()
-        for doc in input_docs:
-            input_data = doc.to_dict()
-            user_details["goals"] = input_data.get("goals", [])
-            user_details["struggles"] = input_data.get("struggles", "")
-            break
-
-        # 3. Get latest plan from Firestore
-        plan_query = plans_collection.where("user_id", "==", user_id).order_by("created_at", direction=firestore.Query.DESCENDING).limit(1)
-        plan_docs = plan_query.stream()
-        for doc in plan_docs:
-            plan_data = doc.to_dict()
-            user_details["latestPlan"] = {"id": doc.id, "week": plan_data.get("week"), "theme": plan_data.get("theme")}
-            user_details["planStatus"] = "Active" # Assuming plan exists means active
-            break
-        else: # If no plan found
-             user_details["planStatus"] = "Pending Input" # Or determine based on input existence
-
-        # 4. Get feedback history from Firestore (limit for brevity)
-        feedback_query = feedback_collection.where("user_id", "==", user_id).order_by("created_at", direction=firestore.Query.DESCENDING).limit(5)
-        feedback_docs = feedback_query.stream()
-        for doc in feedback_docs:
-            feedback_data = doc.to_dict()
-            user_details["feedbackHistory"].append({
-                "id": doc.id,
-                "plan_id": feedback_data.get("plan_id"),
-                "rating": feedback_data.get("rating"),
-                "comments": feedback_data.get("comments", ""),
-                "created_at": feedback_data.get("created_at") # Timestamp might need formatting
+        if "profile" not in degraded:
+            user_details.update({
+                "email": user_record.email,
+                "name": user_record.display_name or "N/A",
+                "registrationDate": user_record.creation_timestamp, # Timestamp might need formatting
+                "emailVerified": user_record.email_verified,
             })
-            # Update last feedback rating if needed for summary view (though maybe redundant here)
-            if user_details.get("lastFeedbackRating") is None:
-                 user_details["lastFeedbackRating"] = feedback_data.get("rating")
 
-        return user_details
+        if summary is not None:
+            latest_plan = summary.get("latest_plan")
+            user_details["goals"] = summary.get("goals", [])
+            user_details["struggles"] = summary.get("struggles", "")
+            if latest_plan:
+                user_details["latestPlan"] = {"id": latest_plan["id"], "week": latest_plan.get("week"), "theme": latest_plan.get("theme")}
+            user_details["planStatus"] = summary.get("plan_status")
+            user_details["feedbackHistory"] = summary.get("recent_feedback", [])
+            if summary.get("last_feedback_rating") is not None:
+                user_details["lastFeedbackRating"] = summary["last_feedback_rating"]
+            if not degraded:
+                etag = _detail_etag(user_id, user_record, summary)
+                await detail_etag_cache.set(user_id, {"etag": etag, "version": summary.get("version", 0)})
+                if conditional.matches(request, etag):
+                    return conditional.not_modified(etag)
+                conditional.tag(response, etag)
+            return respond(user_details, response=response)
+
+        if "input" not in degraded:
+            for doc in results["input"]:
+                user_details["goals"] = doc.data.get("goals", [])
+                user_details["struggles"] = doc.data.get("struggles", "")
+
+        if "plan" not in degraded:
+            for doc in results["plan"]:
+                user_details["latestPlan"] = {"id": doc.id, "week": doc.data.get("week"), "theme": doc.data.get("theme")}
+            has_input = "input" not in degraded and len(results["input"]) > 0
+            user_details["planStatus"] = summaries.plan_status(has_input, user_details["latestPlan"] is not None)
+        else:
+            user_details["planStatus"] = None # Unknown while the plan section is degraded
+
+        if "feedback" not in degraded:
+            for doc in results["feedback"]:
+                feedback_data = doc.data
+                user_details["feedbackHistory"].append({
+                    "id": doc.id,
+                    "plan_id": feedback_data.get("plan_id"),
+                    "rating": feedback_data.get("rating"),
+                    "comments": feedback_data.get("comments", ""),
+                    "created_at": feedback_data.get("created_at") # Timestamp might need formatting
+                })
+                # Update last feedback rating if needed for summary view (though maybe redundant here)
+                if user_details.get("lastFeedbackRating") is None:
+                     user_details["lastFeedbackRating"] = feedback_data.get("rating")
+
+        return respond(user_details)
 
-    except firebase_auth.UserNotFoundError:
-        raise HTTPException(status_code=404, detail="User not found in Firebase Authentication")
     except Exception as e:
         print(f"Error fetching user details for {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve user details: {e}")
 
+@router.get("/export")
+async def export_students(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    page_size: int = Query(500, ge=1, le=1000), # Firebase Auth caps a page at 1000 users
+    cursor: str | None = None,
+    current_admin: dict = Depends(admission(export_limiter, get_current_admin_user)),
+):
+    """Streams one row per student: Auth profile, latest input, latest plan and recent feedback (admin only).
+
+    Users are read page_size at a time from Firebase Auth, and each page is joined with a single
+    batched read of the student summaries, so memory stays flat however many students there are.
+    To resume an interrupted export, pass the export_cursor of the last row received as cursor;
+    rows of that page are sent again, so deduplicate on user_id.
+    """
+    storage = get_storage()
+    pages = export.export_pages(storage, page_size, cursor)
+    try:
+        first_page = await anext(pages, []) # Errors before any output still get a proper status
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error starting student export: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to export students: {e}")
+
+    encode = export.csv_rows if format == "csv" else export.ndjson_rows
+
+    async def stream_rows():
+        if format == "csv":
+            yield export.csv_header()
+        yield encode(first_page)
+        try:
+            async for rows in pages:
+                yield encode(rows)
+        except Exception as e:
+            # Headers are already sent, so the stream can only be cut short; the client resumes from the last cursor
+            print(f"Error streaming student export: {e}")
+        finally:
+            await pages.aclose()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="students.{format}"'}
+    return StreamingResponse(stream_rows(), media_type=media_type, headers=headers)
+
+@router.get("/stats", response_model=dict)
+async def read_stats(
+    plan_id: list[str] = Query([], max_length=100), # Plans to include average ratings for (repeatable)
+    current_admin: dict = Depends(get_current_admin_user),
+):
+    """Dashboard analytics: students per plan status, plan count and feedback ratings (admin only).
+
+    Served from counters the student write paths maintain, so the cost does not grow with
+    the number of students.
+    """
+    try:
+        return respond(await stats.read_stats(get_storage(), plan_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error reading admin stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve stats: {e}")
 
+@router.get("/runtime", response_model=dict)
+async def read_runtime_stats(current_admin: dict = Depends(get_current_admin_user)):
+    """Reports in-process runtime state: Firestore executor queue depth and wait time, cache hit/miss counters,
+    background job queues, admission limiters, write buffers and startup phase timings (admin only)."""
+    return {
+        "executor": executor.stats(),
+        "caches": cache_stats(),
+        "jobs": broker_stats(),
+        "admission": limiter_stats(),
+        "write_buffers": buffer_stats(),
+        "startup": startup.report(),
+    }
@@ -1,48 +1,46 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
-import firebase_admin
-from firebase_admin import auth as firebase_auth
 from jose import JWTError, jwt
-import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-# --- TODO: Move these to a config file or environment variables --- 
-SECRET_KEY = os.getenv("SECRET_KEY", "a_very_secret_key_please_change_me") # CHANGE THIS!
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-# --- End Config ---
-
-# Import models (adjust path if needed)
-import sys
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from models.user import UserCreate, UserPublic, Token, TokenData
+from ..models.user import UserCreate, UserPublic, Token, TokenData
+from ..storage.base import EmailAlreadyExistsError, UserNotFoundError, get_storage # Firebase Auth in production
+from ..services.cache import create_cache
+from ..services import summaries # Per-student summaries (and the admin counters that track them)
+from ..services.serialization import respond
+from .. import config
+from ..config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter()
 
 # --- Firebase Authentication Functions ---
 
-def create_firebase_user(user_data: UserCreate):
+async def create_firebase_user(user_data: UserCreate):
+    storage = get_storage()
     try:
-        user_record = firebase_auth.create_user(
+        user_record = await storage.create_user(
             email=user_data.email,
             password=user_data.password,
             display_name=user_data.name,
-            email_verified=False # Or True if you implement verification
         )
         # You might want to store additional user info (like name) in Firestore
         # using user_record.uid as the document ID.
         # db.collection("users").document(user_record.uid).set({"name": user_data.name, "email": user_data.email})
+        try:
+            # The student's summary, and their count in the admin stats, in one transaction
+            await summaries.create_summary(storage, user_record.uid)
+        except Exception as e:
+            # The account exists either way; the student's first write creates the summary and counts them
+            print(f"Error creating the summary of {user_record.uid}: {e}")
         return {"id": user_record.uid, "email": user_record.email, "name": user_record.display_name}
-    except firebase_auth.EmailAlreadyExistsError:
+    except EmailAlreadyExistsError:
         raise HTTPException(status_code=400, detail="Email already registered")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Firebase user creation failed: {e}")
 
-def authenticate_firebase_user(email: str, password: str):
+async def authenticate_firebase_user(email: str, password: str):
     """Authenticates user with Firebase Auth (requires client-side handling or custom token)
        Note: Firebase Admin SDK cannot directly verify passwords.
        This function is a placeholder concept. Proper flow involves:
@@ -54,12 +52,14 @@ def authenticate_firebase_user(email: str, password: str):
        Here, we simulate getting user info after *assuming* client-side auth was successful.
     """
     try:
-        user_record = firebase_auth.get_user_by_email(email)
+        user_record = await get_storage().get_user_by_email(email)
         # We CANNOT verify the password here with Admin SDK.
         # Returning user info assuming password check happened client-side or is bypassed for now.
         return {"id": user_record.uid, "email": user_record.email, "name": user_record.display_name}
-    except firebase_auth.UserNotFoundError:
+    except UserNotFoundError:
         return None
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching user by email: {e}") # Log error
         return None
@@ -81,8 +81,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 @router.post("/register", response_model=UserPublic)
 async def register_user(user: UserCreate):
     """Registers a new user using Firebase Authentication."""
-    created_user = create_firebase_user(user)
-    return created_user
+    created_user = await create_firebase_user(user)
+    return respond(created_user)
 
 @router.post("/login", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
@@ -92,7 +92,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     In a real app, the client should send a Firebase ID Token instead of username/password.
     The backend would then verify the ID token.
     """
-    user = authenticate_firebase_user(form_data.username, form_data.password)
+    user = await authenticate_firebase_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -105,30 +105,84 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     access_token = create_access_token(
         data={"sub": user["email"], "uid": user["id"] }, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return respond({"access_token": access_token, "token_type": "bearer"})
 
 # --- Dependency for getting current user from JWT token ---
 # This would replace fake_get_current_user
 
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Verified claims keyed by the SHA-256 of the bearer token, kept until the token's own "exp",
+# so repeat requests with the same token skip signature verification entirely.
+token_cache = create_cache("token", max_entries=config.TOKEN_CACHE_MAX_ENTRIES, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60, backend="memory")
+# Firebase Auth custom claims per UID (e.g. {"admin": True}), re-read after ADMIN_CLAIMS_TTL_SECONDS
+claims_cache = create_cache("custom_claims", max_entries=config.TOKEN_CACHE_MAX_ENTRIES, ttl=config.ADMIN_CLAIMS_TTL_SECONDS, backend="memory")
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def _decode_hs256(token: str) -> dict:
+    """Minimal HS256 verifier (signature + exp), several times cheaper per call than python-jose."""
+    try:
+        header_segment, payload_segment, signature_segment = token.split(".")
+        header = json.loads(_b64url_decode(header_segment))
+        if header.get("alg") != "HS256":
+            raise JWTError("Unexpected token algorithm")
+        signing_input = f"{header_segment}.{payload_segment}".encode()
+        expected = hmac.new(SECRET_KEY.encode(), signing_input, hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature_segment)):
+            raise JWTError("Signature verification failed")
+        payload = json.loads(_b64url_decode(payload_segment))
+    except (ValueError, TypeError, binascii.Error) as e: # Malformed segments or JSON
+        raise JWTError(f"Invalid token: {e}")
+    if not isinstance(payload, dict):
+        raise JWTError("Invalid token payload")
+    if "exp" in payload:
+        exp = payload["exp"]
+        if not isinstance(exp, (int, float)) or isinstance(exp, bool): # e.g. "x" or null: 401, as with python-jose
+            raise JWTError("Invalid exp claim")
+        if exp <= time.time():
+            raise JWTError("Signature has expired")
+    return payload
+
+def decode_access_token(token: str) -> dict:
+    """Verifies the token signature and expiry with the configured JWT backend.
+
+    JWT_BACKEND=jose uses python-jose; JWT_BACKEND=native uses the built-in HS256 verifier
+    (only valid while ALGORITHM is HS256). Raises JWTError for any invalid token.
+    """
+    if config.JWT_BACKEND == "native" and ALGORITHM == "HS256":
+        return _decode_hs256(token)
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    cached_user = await token_cache.get(token_key)
+    if cached_user is not None:
+        return dict(cached_user)
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str | None = payload.get("sub")
         uid: str | None = payload.get("uid")
         if email is None or uid is None:
             raise credentials_exception
         token_data = TokenData(email=email)
-    except JWTError:
+    except (JWTError, ValueError):
         raise credentials_exception
     
     # You might want to fetch the user from Firebase Auth again to ensure they still exist
@@ -137,14 +191,30 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     #     raise credentials_exception
     
     # Return user info extracted from token (or fetched from Firebase)
-    return {"id": uid, "email": email} # Or return the full user object if fetched
+    current_user = {"id": uid, "email": email} # Or return the full user object if fetched
+    expires_in = payload.get("exp", 0) - time.time()
+    if expires_in > 0:
+        await token_cache.set(token_key, current_user, ttl=expires_in)
+    return dict(current_user)
+
+async def get_custom_claims(uid: str) -> dict:
+    """Returns the user's Firebase Auth custom claims, cached for ADMIN_CLAIMS_TTL_SECONDS."""
+    claims = await claims_cache.get(uid)
+    if claims is None:
+        user_record = await get_storage().get_user(uid)
+        claims = user_record.custom_claims or {}
+        await claims_cache.set(uid, claims)
+    return claims
 
 async def get_current_admin_user(current_user: dict = Depends(get_current_user)):
-    # Placeholder: In a real app, check if current_user["id"] has admin role in Firestore/DB
-    # For now, assume the first registered user or a specific UID is admin
-    # Example: if current_user["id"] != "EXPECTED_ADMIN_UID":
-    #     raise HTTPException(status_code=403, detail="Not an admin")
-    print(f"Admin access attempt by: {current_user['email']}") # Logging
-    return current_user
-
+    """Allows the request only if the user carries the {"admin": true} custom claim in Firebase Auth.
 
+    Grant it with python -m app.scripts.grant_admin <uid or email>.
+    """
+    try:
+        claims = await get_custom_claims(current_user["id"])
+    except UserNotFoundError:
+        claims = {}
+    if not claims.get("admin"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not an admin")
+    return current_user
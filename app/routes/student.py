@@ -1,156 +1,438 @@
-from fastapi import APIRouter, Depends, HTTPException
-from firebase_admin import firestore
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+import asyncio
+import base64
+import binascii
 import datetime
+import json
 
 # Import models and auth dependency
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from models.student import StudentInputCreate, PlanCreate, FeedbackCreate, PlanInDB, FeedbackInDB, StudentInputInDB
+from ..models.student import StudentInputCreate, PlanCreate, FeedbackCreate, PlanInDB, FeedbackInDB, StudentInputInDB, PlanJob, BatchItemResult, BatchResult, PlanPage, FeedbackPage
 from .auth import get_current_user # Use the JWT-based dependency
+from ..storage.base import FEEDBACK, INPUTS, PLAN_JOBS, PLANS, get_storage # Firestore in production, in-memory for load tests
+from ..services import summaries # Per-student summary documents, maintained on write
+from ..services.cache import create_cache
+from ..services.jobs import create_broker
+from ..services.plan_generator import generate_plan, get_plan_generator
+from ..services.serialization import dumps, respond
+from ..services import conditional # ETag / If-None-Match
+from ..services.admission import admission, create_limiter
+from ..services.write_buffer import create_buffer
+from ..services.idempotency import idempotent # Idempotency-Key replay for the single-item POSTs
+from .. import config
 
-# Get Firestore client (initialized in main.py)
-# This assumes main.py runs first and initializes db
-try:
-    db = firestore.client()
-    inputs_collection = db.collection("student_inputs")
-    plans_collection = db.collection("student_plans")
-    feedback_collection = db.collection("student_feedback")
-except Exception as e:
-    print(f"Error getting Firestore client in student.py: {e}")
-    db = None # Handle case where Firebase might not be initialized
+# Latest plan per user; refreshed whenever POST /student/plan saves a new one
+plan_cache = create_cache("plan", max_entries=config.PLAN_CACHE_MAX_ENTRIES, ttl=config.PLAN_CACHE_TTL_SECONDS)
+
+# Plan generation runs in the background, at most one in-flight job per user
+plan_jobs = create_broker(
+    "plan_generation",
+    workers=config.PLAN_JOB_WORKERS,
+    max_queue=config.PLAN_JOB_MAX_QUEUE,
+    result_ttl=config.PLAN_JOB_RESULT_TTL_SECONDS,
+    collection=PLAN_JOBS, # Pollable after a restart and from any worker; one in-flight job per user across workers
+    claim_ttl=config.PLAN_JOB_CLAIM_TTL_SECONDS,
+)
+
+# Plan ID -> owner, so feedback can check that a plan exists and belongs to the caller without a read.
+# Plans never change owner; "doesn't exist" entries expire sooner, as the plan may still be committing.
+plan_owner_cache = create_cache(
+    "plan_owner", max_entries=config.PLAN_OWNER_CACHE_MAX_ENTRIES, ttl=config.PLAN_OWNER_CACHE_TTL_SECONDS,
+)
+
+# Plan generation will call the AI model, so each user's request rate and concurrency are capped
+plan_limiter = create_limiter(
+    "plan_generation",
+    rate_per_minute=config.PLAN_RATE_PER_MINUTE,
+    burst=config.PLAN_BURST,
+    user_concurrency=config.PLAN_USER_CONCURRENCY,
+    route_concurrency=config.PLAN_ROUTE_CONCURRENCY,
+)
+
+# Optional write-behind for single feedback submissions (FEEDBACK_WRITE_BEHIND); see WriteBuffer
+feedback_buffer = create_buffer(
+    "feedback",
+    summaries.add_feedback_many, # Documents and summaries of a whole batch in one transaction
+    flush_interval=config.FEEDBACK_FLUSH_INTERVAL_MS / 1000,
+    max_batch=config.FEEDBACK_FLUSH_MAX_DOCS,
+    max_pending=config.FEEDBACK_BUFFER_MAX_PENDING,
+)
 
 router = APIRouter()
 
+async def _plan_owners(storage, plan_ids: list[str]) -> dict:
+    """Returns {plan_id: owner user ID, or None if the plan doesn't exist}, reading only cache misses."""
+    owners, misses = {}, []
+    for plan_id in plan_ids:
+        cached = await plan_owner_cache.get(plan_id)
+        if cached is not None:
+            owners[plan_id] = cached["owner"]
+        else:
+            misses.append(plan_id)
+    if misses:
+        plans = await storage.get_many(PLANS, misses)
+        for plan_id in misses:
+            owner = plans[plan_id].data.get("user_id") if plan_id in plans else None
+            ttl = None if owner else config.PLAN_OWNER_NEGATIVE_TTL_SECONDS
+            await plan_owner_cache.set(plan_id, {"owner": owner}, ttl=ttl)
+            owners[plan_id] = owner
+    return owners
+
 @router.post("/input", response_model=StudentInputInDB)
-async def submit_student_input(input_data: StudentInputCreate, current_user: dict = Depends(get_current_user)):
+@idempotent()
+async def submit_student_input(
+    input_data: StudentInputCreate,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+):
     """Receives student goals and struggles and saves to Firestore."""
-    if not db:
-        raise HTTPException(status_code=500, detail="Firestore client not initialized")
-        
+    storage = get_storage()
+
     user_id = current_user["id"]
     timestamp = datetime.datetime.utcnow()
-    
+
     input_doc_data = input_data.dict()
     input_doc_data["user_id"] = user_id
     input_doc_data["created_at"] = timestamp
-    
+
     try:
-        # Add a new document with an auto-generated ID
-        update_time, doc_ref = inputs_collection.add(input_doc_data)
-        print(f"Student input saved for user {user_id} with doc ID: {doc_ref.id}")
-        
+        # Add a new document with an auto-generated ID (and update the user's summary in the same transaction)
+        doc_id = await summaries.add_input(storage, input_doc_data)
+        print(f"Student input saved for user {user_id} with doc ID: {doc_id}")
+
         # Prepare response model
         response_data = input_doc_data.copy()
-        response_data["id"] = doc_ref.id
-        return StudentInputInDB(**response_data)
-        
+        response_data["id"] = doc_id
+        return respond(StudentInputInDB(**response_data))
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error saving student input to Firestore: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to save student input: {e}")
 
-@router.post("/plan", response_model=PlanInDB)
-async def trigger_plan_generation(current_user: dict = Depends(get_current_user)):
-    """Triggers the AI plan generation (mock) and saves the plan to Firestore."""
-    if not db:
-        raise HTTPException(status_code=500, detail="Firestore client not initialized")
-        
+async def _generate_and_save_plan(user_id: str) -> dict:
+    """Runs the AI plan generation and saves the plan to Firestore (executed by a plan job worker)."""
+    return await _save_plan(user_id, await generate_plan(user_id))
+
+async def _save_plan(user_id: str, plan_data: dict) -> dict:
+    """Saves a generated plan (PlanBase fields) to Firestore and returns it as PlanInDB data."""
+    plan_data["user_id"] = user_id
+    plan_data["created_at"] = datetime.datetime.utcnow()
+
+    # Add the generated plan to Firestore (and update the user's summary in the same transaction)
+    doc_id = await summaries.add_plan(get_storage(), plan_data)
+    print(f"Plan generated and saved for user {user_id} with doc ID: {doc_id}")
+
+    # Prepare response model
+    response_data = plan_data.copy()
+    response_data["id"] = doc_id
+    plan = PlanInDB(**response_data)
+    await plan_cache.set(user_id, plan.model_dump()) # The new plan is now the latest one
+    await plan_owner_cache.set(doc_id, {"owner": user_id}) # Ready for feedback on it
+    return plan.model_dump()
+
+def _job_response(job) -> PlanJob:
+    return PlanJob(job_id=job.id, status=job.status, plan=job.result, error=job.error)
+
+@router.post("/plan", response_model=PlanJob, status_code=202)
+@idempotent(status_code=202)
+async def trigger_plan_generation(
+    current_user: dict = Depends(admission(plan_limiter, get_current_user)),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+):
+    """Queues AI plan generation for the user and returns the job to poll.
+
+    While a job for the user is queued or running, repeated requests return that same job.
+    """
+    get_storage() # Fail fast if storage is unavailable, rather than inside the job
+
     user_id = current_user["id"]
-    timestamp = datetime.datetime.utcnow()
+    job = await plan_jobs.submit(user_id, lambda: _generate_and_save_plan(user_id))
+    return respond(_job_response(job), status_code=202)
+
+@router.get("/plan/jobs/{job_id}", response_model=PlanJob)
+async def get_plan_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Reports the status of a plan-generation job, including the plan once it has succeeded."""
+    job = await plan_jobs.get(job_id)
+    if job is None or job.user_id != current_user["id"]:
+        raise HTTPException(status_code=404, detail=f"Plan job {job_id} not found")
+    return respond(_job_response(job))
+
+def _sse(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
 
-    # --- TODO: Replace with actual AI Plan Generation Logic --- 
-    # This should ideally fetch the latest student input for the user_id
-    # and call the AI service.
-    # For now, we generate a mock plan.
-    mock_plan_data = {
-        "user_id": user_id,
-        "week": 1,
-        "theme": "Mock: Introduction & Basic Greetings (Firestore)",
-        "goals": [
-            "Learn mock greetings via Firestore",
-            "Introduce yourself (mock, Firestore)",
-        ],
-        "activities": [
-            { "type": "Lesson", "title": "Mock Video (FS)", "duration": "15 mins" },
-            { "type": "Practice", "title": "Mock Flashcards (FS)", "duration": "10 mins" },
-        ],
-        "focusAreas": ["Mock Pronunciation (FS)", "Mock Vocabulary (FS)"],
-        "created_at": timestamp
-    }
-    # --- End AI Plan Generation Placeholder ---
-    
+async def _plan_events(user_id: str):
+    plan_data = {}
     try:
-        # Add the generated plan to Firestore
-        update_time, doc_ref = plans_collection.add(mock_plan_data)
-        print(f"Plan generated and saved for user {user_id} with doc ID: {doc_ref.id}")
-        
-        # Prepare response model
-        response_data = mock_plan_data.copy()
-        response_data["id"] = doc_ref.id
-        return PlanInDB(**response_data)
-        
+        async for section, value in get_plan_generator().sections(user_id):
+            plan_data[section] = value
+            yield _sse(section, value)
+        # Shielded: once generated, the plan is saved even if the client disconnects meanwhile
+        plan = await asyncio.shield(_save_plan(user_id, plan_data))
     except Exception as e:
-        print(f"Error saving plan to Firestore: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to save generated plan: {e}")
-
-@router.get("/plan", response_model=PlanInDB)
-async def get_student_plan(current_user: dict = Depends(get_current_user)):
-    """Retrieves the latest learning plan for the user from Firestore."""
-    if not db:
-        raise HTTPException(status_code=500, detail="Firestore client not initialized")
-        
+        # The 200 and earlier sections are already sent, so the failure is reported in the stream
+        print(f"Error streaming plan generation for user {user_id}: {e}")
+        yield _sse("error", {"detail": "Plan generation failed"})
+        return
+    yield _sse("plan", plan)
+
+@router.get("/plan/stream", responses={200: {"content": {"text/event-stream": {}}, "description": "Plan sections as Server-Sent Events"}})
+async def stream_plan_generation(current_user: dict = Depends(admission(plan_limiter, get_current_user))):
+    """Generates a plan for the user and streams it as Server-Sent Events while it is produced.
+
+    One event per section (week, theme, goals, activities, focusAreas, each with its JSON
+    value as data), sent as soon as the generator produces it. The plan is then saved once,
+    like a POST /student/plan job's, and sent as a final "plan" event (PlanInDB, with its ID).
+    A failure after the stream has started is sent as an "error" event, and nothing is saved.
+    """
+    get_storage() # Fail fast if storage is unavailable, before the 200 is sent
+    return StreamingResponse(
+        _plan_events(current_user["id"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # No proxy buffering of the events
+    )
+
+def _plan_etag(plan: dict) -> str:
+    # Plan documents are never modified after creation, so the ID alone identifies the content
+    return conditional.make_etag(PLANS, plan["id"])
+
+@router.get("/plan", response_model=PlanInDB, responses={304: {"description": "Plan unchanged since the given ETag"}})
+async def get_student_plan(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+    """Retrieves the latest learning plan for the user from Firestore.
+
+    The response carries an ETag; a request whose If-None-Match still matches gets an empty 304.
+    While the plan is cached that costs no Firestore read and no serialization.
+    """
+    storage = get_storage()
+
     user_id = current_user["id"]
-    
+
+    cached_plan = await plan_cache.get(user_id)
+    if cached_plan is not None:
+        etag = _plan_etag(cached_plan)
+        if conditional.matches(request, etag):
+            return conditional.not_modified(etag)
+        conditional.tag(response, etag)
+        return respond(PlanInDB(**cached_plan), response=response)
+
     try:
-        # Query for plans for the user, order by creation time descending, limit to 1
-        query = plans_collection.where("user_id", "==", user_id).order_by("created_at", direction=firestore.Query.DESCENDING).limit(1)
-        results = query.stream()
-        
         latest_plan = None
-        for doc in results:
-            plan_data = doc.to_dict()
-            plan_data["id"] = doc.id
-            latest_plan = PlanInDB(**plan_data)
-            break # Since we limited to 1
-            
+        # The summary document carries the full latest plan, so this is a single document read
+        summary = await summaries.get_summary(storage, user_id)
+        if summary is not None:
+            plan_data = summary.get("latest_plan")
+            if plan_data:
+                latest_plan = PlanInDB(**plan_data)
+        else:
+            # No summary yet (written before summaries existed): query for the user's newest plan
+            for doc in await storage.query_by_user(PLANS, user_id, 1):
+                plan_data = doc.data
+                plan_data["id"] = doc.id
+                latest_plan = PlanInDB(**plan_data)
+
         if not latest_plan:
             raise HTTPException(status_code=404, detail="Plan not found for user")
-            
-        return latest_plan
-        
+
+        plan_dump = latest_plan.model_dump()
+        await plan_cache.set(user_id, plan_dump)
+        etag = _plan_etag(plan_dump)
+        if conditional.matches(request, etag):
+            return conditional.not_modified(etag)
+        conditional.tag(response, etag)
+        return respond(latest_plan, response=response)
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching plan from Firestore: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve plan: {e}")
 
 @router.post("/feedback", response_model=FeedbackInDB)
-async def submit_feedback(feedback_data: FeedbackCreate, current_user: dict = Depends(get_current_user)):
+@idempotent()
+async def submit_feedback(
+    feedback_data: FeedbackCreate,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+):
     """Receives feedback on a specific learning plan and saves to Firestore."""
-    if not db:
-        raise HTTPException(status_code=500, detail="Firestore client not initialized")
-        
+    storage = get_storage()
+
     user_id = current_user["id"]
     timestamp = datetime.datetime.utcnow()
-    
-    # Check if the plan exists (optional but good practice)
-    plan_ref = plans_collection.document(feedback_data.plan_id)
-    if not plan_ref.get().exists:
+
+    # Check that the plan exists and is the caller's (usually answered by the plan owner cache)
+    try:
+        owner = (await _plan_owners(storage, [feedback_data.plan_id]))[feedback_data.plan_id]
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error checking plan {feedback_data.plan_id} for feedback: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to check plan: {e}")
+    if owner is None:
         raise HTTPException(status_code=404, detail=f"Plan with ID {feedback_data.plan_id} not found")
-        
+    if owner != user_id:
+        raise HTTPException(status_code=403, detail=f"Plan with ID {feedback_data.plan_id} belongs to another user")
+
     feedback_doc_data = feedback_data.dict()
     feedback_doc_data["user_id"] = user_id
     feedback_doc_data["created_at"] = timestamp
-    
+
     try:
-        # Add the feedback document
-        update_time, doc_ref = feedback_collection.add(feedback_doc_data)
-        print(f"Feedback saved for user {user_id} on plan {feedback_data.plan_id} with doc ID: {doc_ref.id}")
-        
+        if config.FEEDBACK_WRITE_BEHIND:
+            # Created, with its summary update, in the next batched commit along with other students' feedback
+            doc_id = storage.new_id(FEEDBACK)
+            await feedback_buffer.add(doc_id, feedback_doc_data, wait=config.FEEDBACK_DURABLE_ACK)
+        else:
+            # Add the feedback document (and update the user's summary in the same transaction)
+            doc_id = await summaries.add_feedback(storage, feedback_doc_data)
+            print(f"Feedback saved for user {user_id} on plan {feedback_data.plan_id} with doc ID: {doc_id}")
+
         # Prepare response model
         response_data = feedback_doc_data.copy()
-        response_data["id"] = doc_ref.id
-        return FeedbackInDB(**response_data)
-        
+        response_data["id"] = doc_id
+        return respond(FeedbackInDB(**response_data))
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error saving feedback to Firestore: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to save feedback: {e}")
 
+# --- Batch endpoints (offline clients replaying queued writes) ---
+
+def _check_batch_size(items: list):
+    if len(items) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {config.BATCH_MAX_ITEMS} items per batch")
+
+async def _write_batch(storage, user_id: str, collection: str, docs: list, rejected: dict, record_summary) -> BatchResult:
+    """Creates (index, data) docs with chunked batch commits and folds them into the user's summary."""
+    ids = [(index, storage.new_id(collection), data) for index, data in docs]
+    errors = await storage.create_many(collection, [(doc_id, data) for _, doc_id, data in ids])
+    committed = [(index, doc_id, data) for index, doc_id, data in ids if doc_id not in errors]
+    failed = {index: f"Failed to save: {errors[doc_id]}" for index, doc_id, _ in ids if doc_id in errors}
+    if committed:
+        try:
+            await record_summary(storage, user_id, [(doc_id, data) for _, doc_id, data in committed])
+        except Exception as e:
+            # The documents are saved; the summary catches up on the next write or a rebuild
+            print(f"Error updating summary for user {user_id} after batch write: {e}")
+    if failed:
+        print(f"Batch failed to save {len(failed)} of {len(ids)} documents to {collection} for user {user_id}")
+
+    results = [BatchItemResult(index=index, status="created", id=doc_id) for index, doc_id, _ in committed]
+    results += [BatchItemResult(index=index, status="rejected", error=error) for index, error in rejected.items()]
+    results += [BatchItemResult(index=index, status="failed", error=error) for index, error in failed.items()]
+    results.sort(key=lambda result: result.index)
+    return BatchResult(created=len(committed), rejected=len(rejected), failed=len(failed), results=results)
+
+def _timestamps(count: int):
+    # One microsecond apart, so created_at ordering matches submission order
+    timestamp = datetime.datetime.utcnow()
+    return [timestamp + datetime.timedelta(microseconds=i) for i in range(count)]
+
+@router.post("/input/batch", response_model=BatchResult)
+async def submit_student_input_batch(items: list[StudentInputCreate] = Body(...), current_user: dict = Depends(get_current_user)):
+    """Saves a list of student inputs with chunked batch commits and reports the outcome of each item."""
+    storage = get_storage()
+    _check_batch_size(items)
+
+    user_id = current_user["id"]
+    docs = []
+    for index, (item, timestamp) in enumerate(zip(items, _timestamps(len(items)))):
+        input_doc_data = item.dict()
+        input_doc_data["user_id"] = user_id
+        input_doc_data["created_at"] = timestamp
+        docs.append((index, input_doc_data))
+
+    return respond(await _write_batch(storage, user_id, INPUTS, docs, {}, summaries.record_inputs))
+
+@router.post("/feedback/batch", response_model=BatchResult)
+async def submit_feedback_batch(items: list[FeedbackCreate] = Body(...), current_user: dict = Depends(get_current_user)):
+    """Saves a list of feedback entries with chunked batch commits and reports the outcome of each item.
+
+    Referenced plans are checked against the plan owner cache, with a single get_all for the rest;
+    items for unknown plans or other users' plans are rejected.
+    """
+    storage = get_storage()
+    _check_batch_size(items)
+
+    user_id = current_user["id"]
+    try:
+        plan_owners = await _plan_owners(storage, sorted({item.plan_id for item in items}))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error checking plans for feedback batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to check plans: {e}")
+
+    docs, rejected = [], {}
+    for index, (item, timestamp) in enumerate(zip(items, _timestamps(len(items)))):
+        if plan_owners[item.plan_id] is None:
+            rejected[index] = f"Plan with ID {item.plan_id} not found"
+            continue
+        if plan_owners[item.plan_id] != user_id:
+            rejected[index] = f"Plan with ID {item.plan_id} belongs to another user"
+            continue
+        feedback_doc_data = item.dict()
+        feedback_doc_data["user_id"] = user_id
+        feedback_doc_data["created_at"] = timestamp
+        docs.append((index, feedback_doc_data))
+
+    return respond(await _write_batch(storage, user_id, FEEDBACK, docs, rejected, summaries.record_feedback))
+
+# --- History (cursor pagination, newest first) ---
+
+def _encode_cursor(doc) -> str:
+    # Opaque to clients: the (created_at, document ID) of the last document on the page
+    return base64.urlsafe_b64encode(dumps([doc.data["created_at"], doc.id])).decode()
+
+def _decode_cursor(start_after: str) -> tuple:
+    try:
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(start_after.encode()))
+        return datetime.datetime.fromisoformat(created_at), doc_id
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid start_after cursor")
+
+async def _history_page(collection: str, user_id: str, limit: int, start_after: str | None) -> tuple[list, str | None]:
+    """Returns (up to limit of the user's documents, cursor for the next page or None at the end)."""
+    cursor = _decode_cursor(start_after) if start_after else None
+    try:
+        # One extra document tells whether there is a next page
+        docs = await get_storage().query_by_user(collection, user_id, limit + 1, start_after=cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error querying {collection} for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve history: {e}")
+    if len(docs) > limit:
+        return docs[:limit], _encode_cursor(docs[limit - 1])
+    return docs, None
+
+@router.get("/plans", response_model=PlanPage)
+async def list_student_plans(
+    limit: int = Query(20, ge=1, le=100),
+    start_after: str | None = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Lists the user's plans, newest first, one page at a time.
+
+    Pass the returned next_start_after as start_after to continue; it is None on the last page.
+    """
+    docs, next_start_after = await _history_page(PLANS, current_user["id"], limit, start_after)
+    plans = [PlanInDB(**{**doc.data, "id": doc.id}) for doc in docs]
+    return respond(PlanPage(plans=plans, next_start_after=next_start_after))
+
+@router.get("/feedback", response_model=FeedbackPage)
+async def list_student_feedback(
+    limit: int = Query(20, ge=1, le=100),
+    start_after: str | None = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Lists the feedback the user has given, newest first, one page at a time.
+
+    Pass the returned next_start_after as start_after to continue; it is None on the last page.
+    """
+    docs, next_start_after = await _history_page(FEEDBACK, current_user["id"], limit, start_after)
+    feedback = [FeedbackInDB(**{**doc.data, "id": doc.id}) for doc in docs]
+    return respond(FeedbackPage(feedback=feedback, next_start_after=next_start_after))
@@ -0,0 +1,45 @@
+"""Grants (or revokes) the {"admin": true} Firebase Auth custom claim that the admin routes require.
+
+The user's other custom claims are kept. Running workers pick the change up within
+ADMIN_CLAIMS_TTL_SECONDS (their cached claims expire); the user's token does not change.
+
+Usage (from the backend root, with the same Firebase credentials as the app):
+    python -m app.scripts.grant_admin admin@example.com
+    python -m app.scripts.grant_admin <uid> --revoke
+"""
+import argparse
+import asyncio
+import sys
+
+from ..storage.base import UserNotFoundError, get_storage
+
+
+async def grant(user: str, admin: bool) -> int:
+    storage = get_storage()
+    try:
+        user_record = await (storage.get_user_by_email(user) if "@" in user else storage.get_user(user))
+    except UserNotFoundError:
+        print(f"User {user} not found")
+        return 1
+
+    claims = dict(user_record.custom_claims or {})
+    if admin:
+        claims["admin"] = True
+    else:
+        claims.pop("admin", None)
+    await storage.set_custom_claims(user_record.uid, claims)
+
+    print(f"{'Granted' if admin else 'Revoked'} admin for {user_record.email} ({user_record.uid}); claims are now {claims}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Grant or revoke the admin custom claim.")
+    parser.add_argument("user", help="Firebase Auth UID or email address")
+    parser.add_argument("--revoke", action="store_true", help="Remove the claim instead")
+    args = parser.parse_args(argv)
+    return asyncio.run(grant(args.user, admin=not args.revoke))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
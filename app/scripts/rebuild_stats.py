@@ -0,0 +1,75 @@
+"""Recomputes the admin_stats shards and plan_stats documents behind GET /admin/stats.
+
+Needed once for data written before the counters existed, or to correct drift. It scans every
+user, so run it while students are not writing (concurrent writes during the scan are lost).
+
+Usage (from the backend root, with the same Firebase credentials as the app):
+    python -m app.scripts.rebuild_stats
+"""
+import argparse
+import asyncio
+import sys
+
+from .. import config
+from ..services import stats, summaries
+from ..storage.base import FEEDBACK, PLANS, get_storage
+
+# query_by_user needs a limit; high enough to cover any one student's history
+PER_USER_LIMIT = 100000
+
+
+async def rebuild() -> int:
+    storage = get_storage()
+    totals = {
+        "students_by_status": dict.fromkeys(
+            (summaries.PLAN_STATUS_PENDING_INPUT, summaries.PLAN_STATUS_AWAITING_PLAN, summaries.PLAN_STATUS_ACTIVE), 0,
+        ),
+        "plans": 0,
+        "rating_count": 0,
+        "rating_sum": 0,
+    }
+    plan_ratings = {}
+
+    page_token = None
+    while True:
+        user_records, page_token = await storage.list_users(1000, page_token)
+        user_ids = [user_record.uid for user_record in user_records]
+        summary_docs = await storage.get_many(summaries.SUMMARIES_COLLECTION, user_ids)
+        for user_id in user_ids:
+            summary = summary_docs.get(user_id)
+            if summary is None:
+                # Students are counted from their summary's creation on, so give them one (the shards are reset below)
+                await summaries.create_summary(storage, user_id)
+            status = summary.data["plan_status"] if summary else summaries.PLAN_STATUS_PENDING_INPUT
+            totals["students_by_status"][status] = totals["students_by_status"].get(status, 0) + 1
+            totals["plans"] += len(await storage.query_by_user(PLANS, user_id, PER_USER_LIMIT))
+            for doc in await storage.query_by_user(FEEDBACK, user_id, PER_USER_LIMIT):
+                rating = doc.data.get("rating") or 0
+                totals["rating_count"] += 1
+                totals["rating_sum"] += rating
+                plan = plan_ratings.setdefault(doc.data.get("plan_id"), {"rating_count": 0, "rating_sum": 0})
+                plan["rating_count"] += 1
+                plan["rating_sum"] += rating
+        print(f"Counted {len(user_ids)} users")
+        if not page_token:
+            break
+
+    # All totals go to the first shard; the other shards are reset
+    for n in range(config.STATS_SHARDS):
+        shard = totals if n == 0 else {}
+        await storage.set(stats.STATS_COLLECTION, f"shard-{n}", shard)
+    for plan_id, ratings in plan_ratings.items():
+        await storage.set(stats.PLAN_STATS_COLLECTION, plan_id, ratings)
+
+    print(f"Done: {totals}, {len(plan_ratings)} rated plans.")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Recompute the admin stats counters.")
+    parser.parse_args(argv)
+    return asyncio.run(rebuild())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Backfills / rebuilds student_summaries/{uid} from the source collections.
+
+Usage (from the backend root, with the same Firebase credentials as the app):
+    python -m app.scripts.rebuild_summaries                # every Firebase Auth user
+    python -m app.scripts.rebuild_summaries --user UID ...  # specific users only
+"""
+import argparse
+import asyncio
+import sys
+
+from ..services import summaries
+from ..storage.base import get_storage
+
+
+async def _all_user_ids(storage):
+    page_token = None
+    while True:
+        user_records, page_token = await storage.list_users(1000, page_token)
+        for user_record in user_records:
+            yield user_record.uid
+        if not page_token:
+            break
+
+async def _iterate(user_ids):
+    for user_id in user_ids:
+        yield user_id
+
+async def rebuild(user_ids=None) -> int:
+    storage = get_storage()
+    rebuilt = failed = 0
+    async for user_id in (_iterate(user_ids) if user_ids else _all_user_ids(storage)):
+        try:
+            summary = await summaries.rebuild_summary(storage, user_id)
+            rebuilt += 1
+            print(f"Rebuilt summary for {user_id}: {summary['plan_status']}")
+        except Exception as e:
+            failed += 1
+            print(f"Error rebuilding summary for {user_id}: {e}")
+
+    print(f"Done: {rebuilt} rebuilt, {failed} failed.")
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild per-student summary documents.")
+    parser.add_argument("--user", action="append", dest="user_ids", help="Only rebuild this user ID (repeatable)")
+    args = parser.parse_args(argv)
+    return asyncio.run(rebuild(args.user_ids))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
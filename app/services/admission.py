@@ -0,0 +1,201 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, HTTPException
+
+from .. import config
+
+# Every limiter created through create_limiter() registers here so its state can be reported
+_limiters: dict = {}
+
+
+class _UserState:
+    __slots__ = ("tokens", "refilled_at", "in_flight", "waiting")
+
+    def __init__(self, burst: float):
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.waiting = 0
+
+
+class AdmissionLimiter:
+    """Admission control for one expensive route.
+
+    Per user: a token bucket (rate_per_minute, burst) and a concurrency limit (user_concurrency).
+    Per route: a concurrency limit across all users (route_concurrency). A request that can't run
+    yet waits, at most max_wait seconds and only while the route has fewer than max_waiting
+    waiters and the user fewer than user_concurrency. Otherwise it is shed: 429 when the user's
+    own limits are exceeded, 503 when the route is at capacity, both with Retry-After.
+    Limits <= 0 are disabled. State is per worker process.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: float, user_concurrency: int,
+                 route_concurrency: int, max_waiting: int, max_wait: float, max_users: int = 10000):
+        self.name = name
+        self.rate = rate_per_minute / 60 # Tokens per second
+        self.burst = max(1.0, burst)
+        self.user_concurrency = user_concurrency
+        self.route_concurrency = route_concurrency
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.max_users = max_users
+        self._users: dict = {} # user_id -> _UserState
+        self._in_flight = 0
+        self._waiting = 0
+        self._condition: asyncio.Condition | None = None
+        self._admitted = 0
+        self._queued = 0
+        self._rate_limited = 0
+        self._user_limited = 0
+        self._shed = 0
+        self._timed_out = 0
+
+    def _user(self, user_id: str) -> _UserState:
+        state = self._users.get(user_id)
+        if state is None:
+            if len(self._users) >= self.max_users:
+                self._prune()
+            state = self._users[user_id] = _UserState(self.burst)
+        return state
+
+    def _prune(self):
+        # Forget idle users; a fresh state starts with a full bucket, which an idle user has anyway
+        now = time.monotonic()
+        for user_id, state in list(self._users.items()):
+            full = self.rate <= 0 or state.tokens + (now - state.refilled_at) * self.rate >= self.burst
+            if not state.in_flight and not state.waiting and full:
+                del self._users[user_id]
+
+    def _reject(self, status_code: int, retry_after: float, detail: str):
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def _token_wait(self, state: _UserState) -> float:
+        """Refills the user's bucket and returns how long until a token is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        state.tokens = min(self.burst, state.tokens + (now - state.refilled_at) * self.rate)
+        state.refilled_at = now
+        wait = 0.0 if state.tokens >= 1 else (1 - state.tokens) / self.rate
+        if wait > self.max_wait:
+            self._rate_limited += 1
+            self._reject(429, wait, f"Rate limit exceeded for {self.name}")
+        return wait
+
+    def _can_run(self, state: _UserState) -> bool:
+        return ((self.user_concurrency <= 0 or state.in_flight < self.user_concurrency)
+                and (self.route_concurrency <= 0 or self._in_flight < self.route_concurrency))
+
+    @asynccontextmanager
+    async def admit(self, user_id: str):
+        state = self._user(user_id)
+        token_wait = self._token_wait(state)
+        if token_wait or not self._can_run(state):
+            if self.user_concurrency > 0 and state.waiting >= self.user_concurrency:
+                self._user_limited += 1
+                self._reject(429, self.max_wait, f"Too many concurrent {self.name} requests")
+            if self._waiting >= self.max_waiting:
+                self._shed += 1
+                self._reject(503, self.max_wait, f"{self.name} is at capacity, retry later")
+            if self.rate > 0:
+                state.tokens -= 1 # Reserves the next token; the wait below covers its refill
+            try:
+                await self._wait(state, token_wait)
+            except BaseException:
+                # Shed (or the client went away) without running: the reserved token goes back
+                if self.rate > 0:
+                    state.tokens = min(self.burst, state.tokens + 1)
+                raise
+        elif self.rate > 0:
+            state.tokens -= 1
+
+        state.in_flight += 1
+        self._in_flight += 1
+        self._admitted += 1
+        try:
+            yield
+        finally:
+            state.in_flight -= 1
+            self._in_flight -= 1
+            async with self._get_condition():
+                self._condition.notify_all()
+
+    async def _wait(self, state: _UserState, token_wait: float):
+        self._queued += 1
+        state.waiting += 1
+        self._waiting += 1
+        deadline = time.monotonic() + self.max_wait
+        try:
+            if token_wait:
+                await asyncio.sleep(token_wait)
+            condition = self._get_condition()
+            async with condition:
+                await asyncio.wait_for(condition.wait_for(lambda: self._can_run(state)), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            self._reject(503, self.max_wait, f"{self.name} is at capacity, retry later")
+        finally:
+            state.waiting -= 1
+            self._waiting -= 1
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Bound to the running loop, so created on first use rather than at import
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_minute": self.rate * 60,
+            "burst": self.burst,
+            "user_concurrency": self.user_concurrency,
+            "route_concurrency": self.route_concurrency,
+            "max_waiting": self.max_waiting,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "tracked_users": len(self._users),
+            "admitted": self._admitted,
+            "queued": self._queued,
+            "rate_limited": self._rate_limited, # 429: user's token bucket empty
+            "user_limited": self._user_limited, # 429: user's concurrency and queue share full
+            "shed": self._shed, # 503: route queue full
+            "timed_out": self._timed_out, # 503: waited max_wait without a slot
+        }
+
+
+def create_limiter(name: str, rate_per_minute: float, burst: float, user_concurrency: int, route_concurrency: int) -> AdmissionLimiter:
+    limiter = AdmissionLimiter(
+        name,
+        rate_per_minute=rate_per_minute,
+        burst=burst,
+        user_concurrency=user_concurrency,
+        route_concurrency=route_concurrency,
+        max_waiting=config.ADMISSION_MAX_WAITING,
+        max_wait=config.ADMISSION_MAX_WAIT_SECONDS,
+    )
+    _limiters[name] = limiter
+    return limiter
+
+
+def limiter_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+def admission(limiter: AdmissionLimiter, user_dependency):
+    """Route dependency that admits the request through limiter and returns the authenticated user.
+
+    user_dependency is get_current_user or a dependency built on it (e.g. get_current_admin_user).
+    """
+    async def admitted_user(current_user: dict = Depends(user_dependency)):
+        if not config.ADMISSION_ENABLED:
+            yield current_user
+            return
+        async with limiter.admit(current_user["id"]):
+            yield current_user
+    return admitted_user
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from .. import config
+
+# Every cache created through create_cache() registers here so its counters can be reported
+_caches: dict = {}
+
+
+class CacheBackend:
+    """Async key/value cache interface. Values must be JSON-serializable (dicts, lists, scalars)."""
+
+    name: str
+
+    def __init__(self, name: str):
+        self.name = name
+        self._hits = 0
+        self._misses = 0
+
+    async def get(self, key: str):
+        """Returns the cached value, or None on a miss."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value, ttl: float | None = None):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    def _count(self, value):
+        if value is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return value
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with a per-entry TTL and a maximum entry count (one copy per worker)."""
+
+    def __init__(self, name: str, max_entries: int, ttl: float):
+        super().__init__(name)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def get_nowait(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return self._count(None)
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return self._count(None)
+            self._entries.move_to_end(key)
+            return self._count(value)
+
+    def set_nowait(self, key: str, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete_nowait(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    async def get(self, key: str):
+        return self.get_nowait(key)
+
+    async def set(self, key: str, value, ttl: float | None = None):
+        self.set_nowait(key, value, ttl)
+
+    async def delete(self, key: str):
+        self.delete_nowait(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return {**super().stats(), "size": size, "max_entries": self.max_entries, "ttl_seconds": self.ttl, "evictions": self._evictions}
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker/instance through Redis.
+
+    Entry count is bounded by the Redis server's maxmemory policy (use allkeys-lru), not here.
+    Hit/miss counters are per process.
+    """
+
+    def __init__(self, name: str, url: str, ttl: float):
+        super().__init__(name)
+        try:
+            import redis.asyncio as redis # Optional dependency, only needed for this backend
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.ttl = ttl
+        self._client = redis.from_url(url)
+        self._prefix = f"suri:{name}:"
+
+    async def get(self, key: str):
+        raw = await self._client.get(self._prefix + key)
+        return self._count(json.loads(raw) if raw is not None else None)
+
+    async def set(self, key: str, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        await self._client.set(self._prefix + key, json.dumps(value), px=max(1, int(ttl * 1000)))
+
+    async def delete(self, key: str):
+        await self._client.delete(self._prefix + key)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "ttl_seconds": self.ttl}
+
+
+def create_cache(name: str, max_entries: int, ttl: float, backend: str | None = None) -> CacheBackend:
+    """Creates a named cache on the configured backend (CACHE_BACKEND=memory|redis)."""
+    backend = backend or config.CACHE_BACKEND
+    if backend == "memory":
+        cache = MemoryCache(name, max_entries=max_entries, ttl=ttl)
+    elif backend == "redis":
+        cache = RedisCache(name, url=config.REDIS_URL, ttl=ttl)
+    else:
+        raise ValueError(f"Unknown cache backend: {backend}")
+    _caches[name] = cache
+    return cache
+
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _caches.items()}
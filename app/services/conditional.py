@@ -0,0 +1,42 @@
+import datetime
+import hashlib
+
+from fastapi import Request, Response
+
+from ..storage.base import utc_naive
+
+# Clients may keep a copy but must revalidate it (If-None-Match) before every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def _part(value) -> str:
+    # The same instant has to give the same tag whether it was read from Firestore or written here
+    if isinstance(value, datetime.datetime):
+        return utc_naive(value).isoformat()
+    return str(value)
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag for the representation identified by parts (e.g. document ID and update time)."""
+    digest = hashlib.blake2b("\x1f".join(_part(part) for part in parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match lists etag (compared weakly, as If-None-Match requires)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def tag(response: Response, etag: str):
+    """Sets the validator headers on the handler's injected response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
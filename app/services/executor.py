@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+
+from .. import config
+
+
+class BlockingCallExecutor:
+    """Runs blocking Firebase Admin / Firestore calls on a bounded thread pool.
+
+    Keeps the event loop free while a Firestore round-trip is in flight and records
+    queue depth and queue wait time so saturation is visible before it hurts p99.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="firestore")
+        self._lock = threading.Lock()
+        self._queued = 0 # Submitted, waiting for a worker thread
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) on the pool and awaits its result."""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Backend is busy, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self._queued += 1
+        submitted_at = time.perf_counter()
+
+        def call():
+            waited = time.perf_counter() - submitted_at
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        future = self._pool.submit(call)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # The call never started, so it will never decrement the queue itself
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / started * 1000, 3) if started else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+executor = BlockingCallExecutor(
+    max_workers=config.FIRESTORE_EXECUTOR_WORKERS,
+    max_queue=config.FIRESTORE_EXECUTOR_MAX_QUEUE,
+)
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Awaits a blocking Firebase call without freezing the event loop."""
+    return await executor.run(fn, *args, **kwargs)
@@ -0,0 +1,127 @@
+import asyncio
+import csv
+import datetime
+import io
+
+from .. import config
+from ..storage.base import FEEDBACK, INPUTS, PLANS
+from . import summaries
+from .serialization import dumps
+
+# One row per Auth user, joined with their latest input, latest plan and recent feedback.
+# export_cursor resumes the export at the page the row belongs to (see export_pages()).
+COLUMNS = [
+    "user_id", "email", "name", "registration_date", "email_verified", "plan_status",
+    "goals", "struggles", "latest_input_at",
+    "latest_plan_id", "latest_plan_week", "latest_plan_theme", "latest_plan_created_at",
+    "recent_feedback_count", "recent_feedback_avg_rating", "last_feedback_rating", "last_feedback_at",
+    "export_cursor",
+]
+
+# Only what the row needs: the summary's latest_plan is the full plan document
+SUMMARY_EXPORT_FIELDS = [
+    "goals", "struggles", "latest_input_at", "plan_status", "recent_feedback", "last_feedback_rating",
+    "latest_plan.id", "latest_plan.week", "latest_plan.theme", "latest_plan.created_at",
+]
+INPUT_EXPORT_FIELDS = ["goals", "struggles", "created_at"]
+PLAN_EXPORT_FIELDS = ["week", "theme", "created_at"]
+FEEDBACK_EXPORT_FIELDS = ["rating", "created_at"]
+
+
+def _row(user_record, summary: dict | None, cursor: str | None) -> dict:
+    summary = summary or summaries.empty_summary(user_record.uid)
+    latest_plan = summary.get("latest_plan") or {}
+    recent = summary.get("recent_feedback") or []
+    ratings = [f["rating"] for f in recent if f.get("rating") is not None]
+    registered = user_record.creation_timestamp
+    return {
+        "user_id": user_record.uid,
+        "email": user_record.email,
+        "name": user_record.display_name or "N/A",
+        "registration_date": datetime.datetime.fromtimestamp(registered / 1000, datetime.timezone.utc) if registered else None,
+        "email_verified": user_record.email_verified,
+        "plan_status": summary.get("plan_status"),
+        "goals": "; ".join(summary.get("goals") or []),
+        "struggles": summary.get("struggles") or "",
+        "latest_input_at": summary.get("latest_input_at"),
+        "latest_plan_id": latest_plan.get("id"),
+        "latest_plan_week": latest_plan.get("week"),
+        "latest_plan_theme": latest_plan.get("theme"),
+        "latest_plan_created_at": latest_plan.get("created_at"),
+        "recent_feedback_count": len(recent),
+        "recent_feedback_avg_rating": round(sum(ratings) / len(ratings), 3) if ratings else None,
+        "last_feedback_rating": summary.get("last_feedback_rating"),
+        "last_feedback_at": recent[0].get("created_at") if recent else None,
+        "export_cursor": cursor or "",
+    }
+
+
+async def _summary_from_sources(storage, user_id: str, limit: asyncio.Semaphore) -> dict:
+    """Builds the summary fields the row needs from the source collections (users without a summary)."""
+    async with limit:
+        inputs, plans, feedback = await asyncio.gather(
+            storage.query_by_user(INPUTS, user_id, 1, fields=INPUT_EXPORT_FIELDS),
+            storage.query_by_user(PLANS, user_id, 1, fields=PLAN_EXPORT_FIELDS),
+            storage.query_by_user(FEEDBACK, user_id, summaries.RECENT_FEEDBACK_LIMIT, fields=FEEDBACK_EXPORT_FIELDS),
+        )
+    summary = summaries.empty_summary(user_id)
+    for doc in inputs:
+        summary.update(goals=doc.data.get("goals", []), struggles=doc.data.get("struggles", ""), latest_input_at=doc.data.get("created_at"))
+    for doc in plans:
+        summary["latest_plan"] = {**doc.data, "id": doc.id}
+    summary["recent_feedback"] = [doc.data for doc in feedback]
+    summary["last_feedback_rating"] = feedback[0].data.get("rating") if feedback else None
+    summary["plan_status"] = summaries.plan_status(bool(inputs), bool(plans))
+    return summary
+
+
+async def _page_rows(storage, user_records: list, cursor: str | None, limit: asyncio.Semaphore) -> list[dict]:
+    user_ids = [user_record.uid for user_record in user_records]
+    # One batched read covers every user with a summary; the rest query the sources, a few at a time
+    found = await storage.get_many(summaries.SUMMARIES_COLLECTION, user_ids, fields=SUMMARY_EXPORT_FIELDS)
+    missing = [user_id for user_id in user_ids if user_id not in found]
+    rebuilt = await asyncio.gather(*(_summary_from_sources(storage, user_id, limit) for user_id in missing))
+    summaries_by_user = {user_id: doc.data for user_id, doc in found.items()}
+    summaries_by_user.update(zip(missing, rebuilt))
+    return [_row(user_record, summaries_by_user.get(user_record.uid), cursor) for user_record in user_records]
+
+
+async def export_pages(storage, page_size: int, cursor: str | None = None):
+    """Yields one list of rows per Auth page, starting at cursor (a page token, None for the start).
+
+    Each row's export_cursor is the token of its own page, so an interrupted export resumes from
+    the last received row's cursor, repeating at most that page's earlier rows. The next Auth page
+    is fetched while the current one is joined, and at most two pages are held at once.
+    """
+    limit = asyncio.Semaphore(config.EXPORT_CONCURRENCY)
+    next_page = asyncio.ensure_future(storage.list_users(page_size, cursor))
+    try:
+        while next_page is not None:
+            user_records, next_cursor = await next_page
+            next_page = asyncio.ensure_future(storage.list_users(page_size, next_cursor)) if next_cursor else None
+            yield await _page_rows(storage, user_records, cursor, limit)
+            cursor = next_cursor
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+
+def _csv_value(value):
+    if isinstance(value, datetime.datetime):
+        return dumps(value).decode().strip('"') # Same ISO form as the JSON responses
+    return "" if value is None else value
+
+def csv_header() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(COLUMNS)
+    return buffer.getvalue().encode()
+
+def csv_rows(rows: list[dict]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_csv_value(row[column]) for column in COLUMNS])
+    return buffer.getvalue().encode()
+
+def ndjson_rows(rows: list[dict]) -> bytes:
+    return b"".join(dumps(row) + b"\n" for row in rows)
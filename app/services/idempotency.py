@@ -0,0 +1,100 @@
+import asyncio
+import functools
+import hashlib
+from fastapi import HTTPException, Response
+
+from .. import config
+from .cache import create_cache
+from .serialization import FastJSONResponse, dumps
+
+# "{user_id}:{endpoint}:{key}" -> the first successful response ({"fingerprint", "status_code", "body", "media_type"})
+response_cache = create_cache(
+    "idempotency", max_entries=config.IDEMPOTENCY_CACHE_MAX_ENTRIES, ttl=config.IDEMPOTENCY_TTL_SECONDS,
+)
+
+# Same keys -> (fingerprint, future of the stored response) while the first request runs (per process)
+_in_flight: dict = {}
+
+# Endpoint parameters that identify the caller rather than the request
+_NOT_FINGERPRINTED = ("current_user", "idempotency_key", "request", "response")
+
+
+def _fingerprint(kwargs: dict) -> str:
+    # The request's parsed body and parameters, so a reused key with a different payload is detected
+    payload = sorted((name, value) for name, value in kwargs.items() if name not in _NOT_FINGERPRINTED)
+    return hashlib.blake2b(dumps(payload), digest_size=16).hexdigest()
+
+
+def _replay(stored: dict, fingerprint: str) -> Response:
+    if stored["fingerprint"] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    return Response(
+        content=stored["body"],
+        status_code=stored["status_code"],
+        media_type=stored["media_type"],
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def idempotent(status_code: int = 200):
+    """Makes a POST endpoint honour an Idempotency-Key header.
+
+    The endpoint declares idempotency_key (the header) and current_user. The first successful
+    (2xx) response per user, endpoint and key is cached for IDEMPOTENCY_TTL_SECONDS and replayed
+    for later requests with the same key, without running the endpoint. Duplicates arriving
+    while the first is still running wait for its result. Failures are not cached, so a retry
+    after an error runs again. status_code is the route's, used when the endpoint returns
+    content instead of a response.
+    """
+    def decorate(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            key = kwargs.get("idempotency_key")
+            if not key:
+                return await endpoint(**kwargs)
+
+            cache_key = f"{kwargs['current_user']['id']}:{endpoint.__name__}:{key}"
+            fingerprint = _fingerprint(kwargs)
+            while True:
+                stored = await response_cache.get(cache_key)
+                if stored is not None:
+                    return _replay(stored, fingerprint)
+                pending = _in_flight.get(cache_key)
+                if pending is None:
+                    break
+                pending_fingerprint, future = pending
+                if pending_fingerprint != fingerprint:
+                    raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+                try:
+                    return _replay(await asyncio.shield(future), fingerprint)
+                except asyncio.CancelledError:
+                    if not future.cancelled():
+                        raise # This request was cancelled
+                    # The first request was cancelled (client went away); run it again
+
+            future = asyncio.get_running_loop().create_future()
+            future.add_done_callback(lambda f: f.cancelled() or f.exception()) # No "never retrieved" warning
+            _in_flight[cache_key] = (fingerprint, future)
+            try:
+                result = await endpoint(**kwargs)
+                if not isinstance(result, Response):
+                    result = FastJSONResponse(result, status_code=status_code)
+                stored = {
+                    "fingerprint": fingerprint,
+                    "status_code": result.status_code,
+                    "body": result.body.decode(),
+                    "media_type": result.media_type,
+                }
+                if 200 <= result.status_code < 300:
+                    await response_cache.set(cache_key, stored)
+                future.set_result(stored)
+                return result
+            except Exception as e:
+                future.set_exception(e) # Concurrent duplicates get the same error
+                raise
+            finally:
+                if not future.done():
+                    future.cancel()
+                _in_flight.pop(cache_key, None)
+        return wrapper
+    return decorate
@@ -0,0 +1,325 @@
+import asyncio
+import contextvars
+import datetime
+import uuid
+from collections import OrderedDict
+from fastapi import HTTPException
+
+from .. import config
+from ..storage.base import get_storage, utc_naive
+
+# Every broker created through create_broker() registers here so its state can be reported
+_brokers: dict = {}
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# Error reported for jobs that were queued or running when their worker process shut down
+JOB_INTERRUPTED = "Interrupted by a server restart, please retry"
+
+
+class Job:
+    def __init__(self, user_id: str, fn):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.status = JOB_QUEUED
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.created_at = datetime.datetime.utcnow()
+        self.finished_at: datetime.datetime | None = None
+        self._fn = fn
+        self._claiming: asyncio.Future | None = None # Set while the broker claims the user's slot for it
+
+    @property
+    def in_flight(self) -> bool:
+        return self.status in (JOB_QUEUED, JOB_RUNNING)
+
+    def to_doc(self, result_ttl: float) -> dict:
+        return {
+            "user_id": self.user_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            # For a Firestore TTL policy on the collection; get() ignores expired documents either way
+            "expire_at": self.created_at + datetime.timedelta(seconds=result_ttl),
+        }
+
+    @classmethod
+    def from_doc(cls, job_id: str, data: dict) -> "Job":
+        """A job read back from its stored document (status and outcome only, it can't be run)."""
+        job = cls(data["user_id"], None)
+        job.id = job_id
+        job.status = data["status"]
+        job.result = data.get("result")
+        job.error = data.get("error")
+        job.created_at = data["created_at"]
+        job.finished_at = data.get("finished_at")
+        return job
+
+
+class JobBroker:
+    """Accepts background jobs and reports on them; see LocalJobBroker for the in-process one."""
+
+    async def submit(self, user_id: str, fn) -> Job:
+        """Queues fn (an async callable returning a dict) for user_id.
+
+        At most one job per user is in flight: while one is queued or running, submitting
+        again returns that same job instead of starting another.
+        """
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Job | None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+    async def shutdown(self):
+        pass
+
+
+class LocalJobBroker(JobBroker):
+    """In-process broker: an asyncio queue drained by a fixed pool of worker tasks.
+
+    Needs no outside services. Finished jobs stay queryable for result_ttl seconds
+    (bounded by max_results) so clients can poll for the outcome.
+
+    With a collection, each job is also saved to storage as collection/{job_id}: when it is
+    queued and when it finishes. get() falls back to that document, so a job's outcome can
+    still be polled after this process restarts, or from another worker. Jobs still queued
+    or running at shutdown are saved as failed (JOB_INTERRUPTED). Saving is best effort: a
+    failed write is logged and counted, and the job runs regardless.
+
+    The one-job-per-user rule then holds across processes too: a new job first claims the
+    user's {collection}_in_flight/{user_id} document in a transaction, and a submit that
+    finds a live claim returns the claiming job (possibly another worker's). The claim is
+    released when the job finishes, and lapses after claim_ttl if its worker dies first.
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int, result_ttl: float, max_results: int = 10000,
+                 collection: str | None = None, claim_ttl: float = 600):
+        self.name = name
+        self.collection = collection
+        self.claims_collection = f"{collection}_in_flight" if collection else None
+        self.claim_ttl = claim_ttl
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list = []
+        self._jobs: OrderedDict = OrderedDict() # job_id -> Job, oldest first
+        self._in_flight: dict = {} # user_id -> Job
+        self._deduplicated = 0
+        self._rejected = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._save_errors = 0
+        self._saves: set = set() # Job creations still being written, off the request path
+
+    def _start(self):
+        # Workers are bound to the running loop, so they start on first use rather than at import
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            # Started from inside a request: give workers a fresh context so they don't inherit its
+            # request-scoped context variables (metrics would attribute job work to that route)
+            self._tasks = [contextvars.Context().run(asyncio.create_task, self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, user_id: str, fn) -> Job:
+        self._start()
+        job = self._in_flight.get(user_id)
+        if job is not None:
+            self._deduplicated += 1
+            if job._claiming is not None:
+                await asyncio.shield(job._claiming) # Its ID is final (maybe another process's job) once claimed
+            return job
+
+        if self._queue.full():
+            self._rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many pending jobs, please retry",
+                headers={"Retry-After": "5"},
+            )
+        job = Job(user_id, fn)
+        self._in_flight[user_id] = job
+        if self.claims_collection is not None:
+            job._claiming = asyncio.get_running_loop().create_future()
+            job._claiming.add_done_callback(lambda f: f.cancelled() or f.exception()) # No "never retrieved" warning
+            try:
+                claimed_by = await self._claim(job)
+            except BaseException as e:
+                del self._in_flight[user_id]
+                job._claiming.set_exception(e if isinstance(e, Exception) else HTTPException(status_code=503, detail="Please retry"))
+                raise
+            if claimed_by != job.id:
+                # Another process's job: report that one (its document may not be written yet)
+                del self._in_flight[user_id]
+                self._deduplicated += 1
+                job.id = claimed_by
+                job._fn = None
+                job._claiming.set_result(None)
+                stored = await self.get(job.id)
+                return stored if stored is not None else job
+            job._claiming.set_result(None)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull: # Filled by other users' jobs while claiming
+            del self._in_flight[user_id]
+            self._rejected += 1
+            job.status = JOB_FAILED # As reported to any duplicate submit that waited for the claim
+            job.error = "Too many pending jobs, please retry"
+            if self.claims_collection is not None:
+                await self._release(job)
+            raise HTTPException(
+                status_code=503,
+                detail="Too many pending jobs, please retry",
+                headers={"Retry-After": "5"},
+            )
+        self._jobs[job.id] = job
+        self._prune()
+        if self.collection is not None:
+            # Written in the background, so the 202 doesn't wait for a storage round-trip
+            save = asyncio.create_task(self._save(job, create=True))
+            self._saves.add(save)
+            save.add_done_callback(self._saves.discard)
+        return job
+
+    async def get(self, job_id: str) -> Job | None:
+        self._prune()
+        job = self._jobs.get(job_id)
+        if job is None and self.collection is not None:
+            # Not from this process (or no longer in memory): its stored document, if any
+            doc = await get_storage().get(self.collection, job_id)
+            if doc is not None and utc_naive(doc.data["expire_at"]) > datetime.datetime.utcnow():
+                job = Job.from_doc(job_id, doc.data)
+        return job
+
+    async def _claim(self, job: Job) -> str:
+        """Claims the user's in-flight slot for job; returns the ID of the job that holds it."""
+        def claim(current: dict | None) -> dict:
+            now = datetime.datetime.utcnow()
+            if current is not None and current["job_id"] and utc_naive(current["expire_at"]) > now:
+                return current # A live claim: left as it is
+            return {"job_id": job.id, "expire_at": now + datetime.timedelta(seconds=self.claim_ttl)}
+        return (await get_storage().transact(self.claims_collection, job.user_id, claim))["job_id"]
+
+    async def _release(self, job: Job):
+        def release(current: dict | None) -> dict:
+            if current is None or current["job_id"] != job.id:
+                return current or {"job_id": None, "expire_at": datetime.datetime.utcnow()} # Not ours (any more)
+            return {**current, "expire_at": datetime.datetime.utcnow()}
+        try:
+            await get_storage().transact(self.claims_collection, job.user_id, release)
+        except Exception as e:
+            # The claim lapses after claim_ttl; until then the user's new jobs return this one
+            print(f"Error releasing the in-flight claim of job {job.id} ({self.name}): {e}")
+
+    async def _save(self, job: Job, create: bool = False):
+        if self.collection is None:
+            return
+        doc = job.to_doc(self.result_ttl)
+        try:
+            if create:
+                # Create, not overwrite: a worker may already have finished the job and saved its outcome
+                errors = await get_storage().create_many(self.collection, [(job.id, doc)])
+                if errors and job.status == JOB_QUEUED:
+                    raise errors[job.id]
+            else:
+                await get_storage().set(self.collection, job.id, doc)
+        except Exception as e:
+            self._save_errors += 1
+            print(f"Error saving job {job.id} ({self.name}): {e}")
+
+    def _prune(self):
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=self.result_ttl)
+        while self._jobs:
+            oldest = next(iter(self._jobs.values()))
+            if oldest.in_flight or (len(self._jobs) <= self.max_results and oldest.created_at > cutoff):
+                break
+            self._jobs.popitem(last=False)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = JOB_RUNNING
+            try:
+                job.result = await job._fn()
+                job.status = JOB_SUCCEEDED
+                self._succeeded += 1
+            except Exception as e:
+                print(f"Job {job.id} ({self.name}) for user {job.user_id} failed: {e}")
+                job.error = str(getattr(e, "detail", e))
+                job.status = JOB_FAILED
+                self._failed += 1
+            finally:
+                job.finished_at = datetime.datetime.utcnow()
+                job._fn = None
+                if self._in_flight.get(job.user_id) is job:
+                    del self._in_flight[job.user_id]
+                self._queue.task_done()
+            # Not reached when cancelled by shutdown(), which saves and releases the job itself
+            await self._save(job)
+            if self.claims_collection is not None:
+                await self._release(job)
+
+    def stats(self) -> dict:
+        return {
+            "broker": type(self).__name__,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": len(self._in_flight),
+            "succeeded": self._succeeded,
+            "failed": self._failed,
+            "deduplicated": self._deduplicated,
+            "rejected": self._rejected,
+            "save_errors": self._save_errors,
+        }
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        await asyncio.gather(*self._saves, return_exceptions=True)
+        # Queued and running jobs are lost with the process; record that, so polling them explains it
+        for job in [job for job in self._jobs.values() if job.in_flight]:
+            job.status = JOB_FAILED
+            job.error = JOB_INTERRUPTED
+            job.finished_at = datetime.datetime.utcnow()
+            job._fn = None
+            await self._save(job)
+            if self.claims_collection is not None:
+                await self._release(job)
+        self._in_flight.clear()
+
+
+def create_broker(name: str, workers: int, max_queue: int, result_ttl: float, collection: str | None = None,
+                  claim_ttl: float = 600, backend: str | None = None) -> JobBroker:
+    """Creates a named job broker on the configured backend (JOB_BROKER=local).
+
+    collection, if given, is where each job's status and result are saved, and claim_ttl how
+    long a job holds its user's in-flight slot at most (see LocalJobBroker).
+    """
+    backend = backend or config.JOB_BROKER
+    if backend != "local":
+        raise ValueError(f"Unknown job broker: {backend}")
+    broker = LocalJobBroker(name, workers=workers, max_queue=max_queue, result_ttl=result_ttl, collection=collection,
+                            claim_ttl=claim_ttl)
+    _brokers[name] = broker
+    return broker
+
+
+def broker_stats() -> dict:
+    return {name: broker.stats() for name, broker in _brokers.items()}
+
+
+async def shutdown_brokers():
+    for broker in _brokers.values():
+        await broker.shutdown()
@@ -0,0 +1,158 @@
+import bisect
+import contextvars
+import time
+
+# Latency buckets in seconds, from sub-millisecond cache hits to multi-second Firestore stalls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# ASGI scope of the request being handled, so storage calls can be labelled with its route
+_current_scope: contextvars.ContextVar = contextvars.ContextVar("current_scope", default=None)
+
+_metrics: list = [] # Rendered in registration order
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Prometheus histogram. observe() is a bisect plus a few list updates, cheap enough for every call."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: dict = {} # label values -> [per-bucket counts..., +Inf count, sum]
+        _metrics.append(self)
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict = {}
+        _metrics.append(self)
+
+    def inc(self, labels: tuple, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    """Gauge read at scrape time from a callback returning {label values: value}."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple, collect):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.collect = collect
+        _metrics.append(self)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.collect().items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+def render() -> str:
+    """Renders every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Route labels ---
+
+def route_label(scope: dict) -> str:
+    """Path template of the matched route, e.g. /admin/users/{user_id}; "unmatched" for 404s."""
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    # Depending on the FastAPI version, an included router's route path may or may not carry the
+    # router prefix. Path params never span "/", so the prefix is whatever leading segments of the
+    # request path the template does not account for.
+    path_segments = scope["path"].rstrip("/").split("/")
+    template_segments = template.rstrip("/").split("/")
+    prefix = "/".join(path_segments[:len(path_segments) - len(template_segments) + 1])
+    return prefix + template
+
+def current_route() -> str:
+    scope = _current_scope.get()
+    return route_label(scope) if scope is not None else "background"
+
+
+# --- Service metrics ---
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"),
+)
+STORAGE_CALL_DURATION = Histogram(
+    "storage_call_duration_seconds", "Firestore / Firebase Auth call latency.", ("route", "operation", "collection"),
+)
+STORAGE_CALL_ERRORS = Counter(
+    "storage_call_errors_total", "Failed Firestore / Firebase Auth calls.", ("route", "operation", "collection"),
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency per route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500 # Reported if the app raises before starting a response
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _current_scope.set(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.observe((scope["method"], route_label(scope), str(status)), time.perf_counter() - started)
+            _current_scope.reset(token)
@@ -0,0 +1,78 @@
+import asyncio
+import copy
+
+from .. import config
+
+# The plan's sections (PlanBase fields), in the order a generator produces them
+SECTIONS = ("week", "theme", "goals", "activities", "focusAreas")
+
+
+class PlanGenerator:
+    """Produces a learning plan section by section.
+
+    sections(user_id) yields (section, value) pairs, one per name in SECTIONS and in that
+    order, as each is ready. GET /student/plan/stream forwards them to the client as they
+    arrive; generate_plan() collects them for the background job.
+    """
+
+    async def sections(self, user_id: str):
+        raise NotImplementedError
+        yield # An async generator
+
+
+class StubPlanGenerator(PlanGenerator):
+    """Deterministic local plan, for development, tests and benchmarks (no model call).
+
+    section_delay_ms is slept before each section, to approximate a model producing it.
+    """
+
+    PLAN = {
+        "week": 1,
+        "theme": "Mock: Introduction & Basic Greetings (Firestore)",
+        "goals": [
+            "Learn mock greetings via Firestore",
+            "Introduce yourself (mock, Firestore)",
+        ],
+        "activities": [
+            { "type": "Lesson", "title": "Mock Video (FS)", "duration": "15 mins" },
+            { "type": "Practice", "title": "Mock Flashcards (FS)", "duration": "10 mins" },
+        ],
+        "focusAreas": ["Mock Pronunciation (FS)", "Mock Vocabulary (FS)"],
+    }
+
+    def __init__(self, section_delay_ms: float = 0):
+        self.section_delay = section_delay_ms / 1000
+
+    async def sections(self, user_id: str):
+        # --- TODO: Replace with actual AI Plan Generation Logic ---
+        # This should ideally fetch the latest student input for the user_id
+        # and call the AI service.
+        for section in SECTIONS:
+            if self.section_delay:
+                await asyncio.sleep(self.section_delay)
+            yield section, copy.deepcopy(self.PLAN[section]) # Callers may modify what they get
+
+
+_generator: PlanGenerator | None = None
+
+
+def get_plan_generator() -> PlanGenerator:
+    """Returns the process-wide plan generator selected by PLAN_GENERATOR (stub)."""
+    global _generator
+    if _generator is None:
+        if config.PLAN_GENERATOR == "stub":
+            _generator = StubPlanGenerator(section_delay_ms=config.PLAN_STUB_SECTION_DELAY_MS)
+        else:
+            raise ValueError(f"Unknown plan generator: {config.PLAN_GENERATOR}")
+    return _generator
+
+
+def set_plan_generator(generator: PlanGenerator | None):
+    """Replaces the plan generator (None: select it from config again on next use)."""
+    global _generator
+    _generator = generator
+
+
+async def generate_plan(user_id: str) -> dict:
+    """Generates a learning plan for the user (PlanBase fields, without user_id/created_at)."""
+    return {section: value async for section, value in get_plan_generator().sections(user_id)}
@@ -0,0 +1,47 @@
+import datetime
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .. import config
+
+
+def _default(obj):
+    # orjson encodes datetime.datetime itself but rejects subclasses, such as the
+    # DatetimeWithNanoseconds that Firestore returns for timestamp fields
+    if isinstance(obj, datetime.datetime):
+        value = obj.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value # Same form as OPT_UTC_Z / pydantic
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    """Encodes a pydantic model (already validated, so only serialized) or plain JSON-like data."""
+    if isinstance(content, BaseModel):
+        return content.__pydantic_serializer__.to_json(content)
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def respond(content, status_code: int = 200, response: Response | None = None):
+    """Returns a handler result, encoded right away when FAST_SERIALIZATION is on.
+
+    Handlers build their response models from validated data, and FastAPI would validate
+    them against response_model a second time before encoding. Returning a response
+    skips that; response_model still documents the schema. With the setting off, the
+    content is returned unchanged and goes through FastAPI's standard path.
+
+    response is the handler's injected Response, if it sets headers (e.g. an ETag): FastAPI
+    applies them on the standard path, and they are copied onto the encoded response here.
+    """
+    if not config.FAST_SERIALIZATION:
+        return content
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,50 @@
+import os
+import time
+
+# Cold-start phases in seconds, reported once the app is ready to serve:
+#   import: importing app.main (FastAPI, routers, services) and building the app
+#   init: the lifespan startup (storage client, Firebase Admin SDK)
+#   warm_up: first storage round-trips made before accepting traffic
+#   since_process_start: interpreter start to ready, including the server's own imports (Linux only)
+_phases: dict = {}
+
+
+def record(phase: str, seconds: float):
+    _phases[phase] = round(seconds, 4)
+
+
+def _process_age() -> float | None:
+    try:
+        with open("/proc/self/stat") as f:
+            started_ticks = int(f.read().rsplit(")", 1)[1].split()[19]) # Field 22: starttime
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - started_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def ready():
+    """Records the process age and prints the startup report."""
+    process_age = _process_age()
+    if process_age is not None:
+        record("since_process_start", process_age)
+    print("Startup: " + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in _phases.items()))
+
+
+def report() -> dict:
+    return dict(_phases)
+
+
+class Timer:
+    """Context manager recording the duration of a startup phase."""
+
+    def __init__(self, phase: str):
+        self.phase = phase
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.phase, time.perf_counter() - self.started)
@@ -0,0 +1,84 @@
+import random
+
+from .. import config
+from . import summaries # Imports this module too; only referenced inside functions
+
+# Admin analytics, maintained incrementally by the student write paths so that
+# GET /admin/stats reads a fixed number of documents however many students there are.
+#
+# Global counters live in admin_stats/shard-{n}. Each write bumps one randomly chosen shard,
+# which spreads concurrent writes past Firestore's ~1 write/second/document limit; reads sum
+# all shards. Per-plan rating counters live in plan_stats/{plan_id}, written only by the
+# plan's owner, so they need no sharding.
+STATS_COLLECTION = "admin_stats"
+PLAN_STATS_COLLECTION = "plan_stats"
+
+
+def _shard_ids() -> list[str]:
+    return [f"shard-{n}" for n in range(config.STATS_SHARDS)]
+
+def _random_shard() -> str:
+    return f"shard-{random.randrange(config.STATS_SHARDS)}"
+
+
+def summary_increments(plans_added: int = 0, feedback_docs: list[tuple[str, dict]] = ()):
+    """Returns a storage.transact() increments callback for a summary update.
+
+    Moves the student between plan-status groups and adds the new plans and ratings, in the
+    same transaction as the summary write, so the counters can't drift from the summaries.
+    A student is counted when their summary is first created: at registration (see
+    summaries.create_summary()), or at the first write of an account made elsewhere.
+    """
+    def increments(current: dict | None, summary: dict) -> list:
+        deltas = {}
+        if current is None:
+            deltas["students_by_status"] = {summary["plan_status"]: 1}
+        elif current["plan_status"] != summary["plan_status"]:
+            deltas["students_by_status"] = {current["plan_status"]: -1, summary["plan_status"]: 1}
+        if plans_added:
+            deltas["plans"] = plans_added
+        plan_ratings = {}
+        for _, data in feedback_docs:
+            plan_ratings.setdefault(data["plan_id"], []).append(data["rating"])
+        if plan_ratings:
+            ratings = [rating for plan in plan_ratings.values() for rating in plan]
+            deltas["rating_count"] = len(ratings)
+            deltas["rating_sum"] = sum(ratings)
+        updates = [(STATS_COLLECTION, _random_shard(), deltas)] if deltas else []
+        updates += [
+            (PLAN_STATS_COLLECTION, plan_id, {"rating_count": len(ratings), "rating_sum": sum(ratings)})
+            for plan_id, ratings in plan_ratings.items()
+        ]
+        return updates
+    return increments
+
+
+def _average(rating_sum: float, rating_count: int) -> float | None:
+    return round(rating_sum / rating_count, 3) if rating_count else None
+
+async def read_stats(storage, plan_ids: list[str] = ()) -> dict:
+    """Sums the counter shards (one get_many) and, if asked, reads per-plan ratings (one more)."""
+    shards = await storage.get_many(STATS_COLLECTION, _shard_ids())
+    by_status = dict.fromkeys((summaries.PLAN_STATUS_PENDING_INPUT, summaries.PLAN_STATUS_AWAITING_PLAN, summaries.PLAN_STATUS_ACTIVE), 0)
+    plans = rating_count = rating_sum = 0
+    for shard in shards.values():
+        for status, count in shard.data.get("students_by_status", {}).items():
+            by_status[status] = by_status.get(status, 0) + count
+        plans += shard.data.get("plans", 0)
+        rating_count += shard.data.get("rating_count", 0)
+        rating_sum += shard.data.get("rating_sum", 0)
+
+    result = {
+        "students": sum(by_status.values()),
+        "students_by_status": by_status,
+        "plans": plans,
+        "ratings": {"count": rating_count, "sum": rating_sum, "average": _average(rating_sum, rating_count)},
+    }
+    if plan_ids:
+        plan_stats = await storage.get_many(PLAN_STATS_COLLECTION, list(plan_ids))
+        result["plan_ratings"] = {}
+        for plan_id in plan_ids:
+            data = plan_stats[plan_id].data if plan_id in plan_stats else {}
+            count, total = data.get("rating_count", 0), data.get("rating_sum", 0)
+            result["plan_ratings"][plan_id] = {"count": count, "sum": total, "average": _average(total, count)}
+    return result
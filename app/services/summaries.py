@@ -0,0 +1,203 @@
+
+from .. import config
+from ..storage.base import FEEDBACK, INPUTS, PLANS, utc_naive
+from . import stats # Admin counters, updated in the same transactions
+from .cache import create_cache
+
+# Denormalized per-student summary: student_summaries/{uid}
+# Kept up to date by the student write paths so that reads of "latest input / latest plan /
+# recent feedback" are a single document fetch instead of three ordered queries.
+SUMMARIES_COLLECTION = "student_summaries"
+RECENT_FEEDBACK_LIMIT = 5
+
+PLAN_STATUS_PENDING_INPUT = "Pending Input"
+PLAN_STATUS_AWAITING_PLAN = "Awaiting Plan"
+PLAN_STATUS_ACTIVE = "Active" # Assuming plan exists means active
+
+# User ID -> {"version"} of the summary as last written or read by this process
+# (or any process, with the redis cache backend). Lets conditional GETs skip the summary read.
+version_cache = create_cache(
+    "summary_version", max_entries=config.SUMMARY_VERSION_CACHE_MAX_ENTRIES, ttl=config.SUMMARY_VERSION_CACHE_TTL_SECONDS,
+)
+
+
+def plan_status(has_input: bool, has_plan: bool) -> str:
+    if has_plan:
+        return PLAN_STATUS_ACTIVE
+    return PLAN_STATUS_AWAITING_PLAN if has_input else PLAN_STATUS_PENDING_INPUT
+
+
+def empty_summary(user_id: str) -> dict:
+    return {
+        "user_id": user_id,
+        "goals": [],
+        "struggles": "",
+        "latest_input_id": None,
+        "latest_input_at": None,
+        "latest_plan": None, # Full plan document (plus "id") so GET /student/plan is one read
+        "plan_status": PLAN_STATUS_PENDING_INPUT,
+        "last_feedback_rating": None,
+        "recent_feedback": [], # Newest first, at most RECENT_FEEDBACK_LIMIT entries
+        "version": 0,
+        "updated_at": None,
+    }
+
+
+# --- Summary mutations ---
+
+def _apply_input(summary: dict, doc_id: str, data: dict):
+    if summary["latest_input_at"] and utc_naive(summary["latest_input_at"]) > utc_naive(data["created_at"]):
+        return # An even newer input already won
+    summary["goals"] = data.get("goals", [])
+    summary["struggles"] = data.get("struggles", "")
+    summary["latest_input_id"] = doc_id
+    summary["latest_input_at"] = data["created_at"]
+
+def _apply_plan(summary: dict, doc_id: str, data: dict):
+    latest_plan = summary["latest_plan"]
+    if latest_plan and utc_naive(latest_plan["created_at"]) > utc_naive(data["created_at"]):
+        return
+    summary["latest_plan"] = {**data, "id": doc_id}
+
+def _apply_feedback(summary: dict, doc_id: str, data: dict):
+    entry = {
+        "id": doc_id,
+        "plan_id": data.get("plan_id"),
+        "rating": data.get("rating"),
+        "comments": data.get("comments", ""),
+        "created_at": data.get("created_at"),
+    }
+    recent = sorted(summary["recent_feedback"] + [entry], key=lambda f: utc_naive(f["created_at"]), reverse=True)
+    summary["recent_feedback"] = recent[:RECENT_FEEDBACK_LIMIT]
+    summary["last_feedback_rating"] = summary["recent_feedback"][0]["rating"]
+
+
+def _folder(user_id: str, apply, docs: list[tuple[str, dict]]):
+    """Returns a storage.transact() mutation that folds docs into the user's summary."""
+    def fold(current: dict | None) -> dict:
+        summary = empty_summary(user_id)
+        if current is not None:
+            summary.update(current)
+        for doc_id, data in docs:
+            apply(summary, doc_id, data)
+        summary["plan_status"] = plan_status(summary["latest_input_id"] is not None, summary["latest_plan"] is not None)
+        summary["version"] += 1
+        summary["updated_at"] = max((data["created_at"] for _, data in docs), key=utc_naive)
+        return summary
+    return fold
+
+
+async def _remember_version(user_id: str, summary: dict):
+    if "version" in summary: # Not when a projection left it out
+        await version_cache.set(user_id, {"version": summary["version"]})
+
+
+async def create_summary(storage, user_id: str):
+    """Creates the user's empty summary, counting them under "Pending Input" (no-op if it exists)."""
+    summary = await storage.transact(
+        SUMMARIES_COLLECTION, user_id, lambda current: current if current is not None else empty_summary(user_id),
+        increments=stats.summary_increments(),
+    )
+    await _remember_version(user_id, summary)
+
+async def _add_with_summary(storage, collection: str, data: dict, apply, increments) -> str:
+    """Creates a document in collection and folds it into the owner's summary atomically.
+
+    Returns the new document ID.
+    """
+    doc_id = storage.new_id(collection)
+    user_id = data["user_id"]
+    summary = await storage.transact(
+        SUMMARIES_COLLECTION, user_id, _folder(user_id, apply, [(doc_id, data)]),
+        creates=[(collection, doc_id, data)], increments=increments([(doc_id, data)]),
+    )
+    await _remember_version(user_id, summary)
+    return doc_id
+
+async def add_input(storage, data: dict) -> str:
+    return await _add_with_summary(storage, INPUTS, data, _apply_input, lambda docs: stats.summary_increments())
+
+async def add_plan(storage, data: dict) -> str:
+    return await _add_with_summary(storage, PLANS, data, _apply_plan, lambda docs: stats.summary_increments(plans_added=1))
+
+async def add_feedback(storage, data: dict) -> str:
+    return await _add_with_summary(storage, FEEDBACK, data, _apply_feedback, lambda docs: stats.summary_increments(feedback_docs=docs))
+
+async def record_inputs(storage, user_id: str, docs: list[tuple[str, dict]]):
+    """Folds already-committed (doc_id, data) inputs into the user's summary in one transaction."""
+    summary = await storage.transact(SUMMARIES_COLLECTION, user_id, _folder(user_id, _apply_input, docs), increments=stats.summary_increments())
+    await _remember_version(user_id, summary)
+
+async def record_feedback(storage, user_id: str, docs: list[tuple[str, dict]]):
+    """Folds already-committed (doc_id, data) feedback into the user's summary in one transaction."""
+    summary = await storage.transact(
+        SUMMARIES_COLLECTION, user_id, _folder(user_id, _apply_feedback, docs), increments=stats.summary_increments(feedback_docs=docs),
+    )
+    await _remember_version(user_id, summary)
+
+
+async def add_feedback_many(storage, docs: list[tuple[str, dict]]):
+    """Creates (doc_id, data) feedback from any number of users and folds each into its owner's
+    summary, all in one transaction (the group commit behind the feedback write buffer)."""
+    by_user = {}
+    for doc_id, data in docs:
+        by_user.setdefault(data["user_id"], []).append((doc_id, data))
+    written = await storage.transact_many(
+        SUMMARIES_COLLECTION,
+        [
+            (user_id, _folder(user_id, _apply_feedback, user_docs), stats.summary_increments(feedback_docs=user_docs))
+            for user_id, user_docs in by_user.items()
+        ],
+        creates=[(FEEDBACK, doc_id, data) for doc_id, data in docs],
+    )
+    for user_id, summary in written.items():
+        await _remember_version(user_id, summary)
+
+
+async def get_summary(storage, user_id: str, fields: list[str] | None = None) -> dict | None:
+    """Reads the user's summary, or only fields of it (see Storage)."""
+    doc = await storage.get(SUMMARIES_COLLECTION, user_id, fields)
+    if doc is None:
+        return None
+    await _remember_version(user_id, doc.data)
+    return doc.data
+
+
+async def cached_version(user_id: str) -> int | None:
+    """The user's summary version as last seen, without a read; None if not cached."""
+    cached = await version_cache.get(user_id)
+    return cached["version"] if cached is not None else None
+
+
+# --- Backfill / rebuild ---
+
+async def rebuild_summary(storage, user_id: str) -> dict:
+    """Recomputes a user's summary from the source collections and overwrites it.
+
+    The source reads happen outside the summary transaction, so run rebuilds while the
+    user is not writing (a concurrent write is picked up by the next rebuild or write).
+    """
+    inputs = await storage.query_by_user(INPUTS, user_id, 1)
+    plans = await storage.query_by_user(PLANS, user_id, 1)
+    feedback = await storage.query_by_user(FEEDBACK, user_id, RECENT_FEEDBACK_LIMIT)
+
+    def rebuild(current: dict | None) -> dict:
+        summary = empty_summary(user_id)
+        # Keep the version monotonic so anything keyed on it sees the rebuild as a change
+        summary["version"] = (current or {}).get("version", 0) + 1
+        for doc in inputs:
+            _apply_input(summary, doc.id, doc.data)
+        for doc in plans:
+            _apply_plan(summary, doc.id, doc.data)
+        for doc in feedback:
+            _apply_feedback(summary, doc.id, doc.data)
+        summary["plan_status"] = plan_status(summary["latest_input_id"] is not None, summary["latest_plan"] is not None)
+        timestamps = [summary["latest_input_at"], (summary["latest_plan"] or {}).get("created_at")]
+        timestamps += [f["created_at"] for f in summary["recent_feedback"]]
+        summary["updated_at"] = max((t for t in timestamps if t), key=utc_naive, default=None)
+        return summary
+
+    # A rebuild can change the student's plan status; keep the status counters in step
+    summary = await storage.transact(SUMMARIES_COLLECTION, user_id, rebuild, increments=stats.summary_increments())
+    await _remember_version(user_id, summary)
+    return summary
@@ -0,0 +1,166 @@
+import asyncio
+import contextlib
+import contextvars
+import time
+from fastapi import HTTPException
+
+from ..storage.base import get_storage
+
+# Every buffer created through create_buffer() registers here so its state can be reported and flushed
+_buffers: dict = {}
+
+
+class WriteBuffer:
+    """Write-behind buffer (group commit).
+
+    Added (doc_id, data) documents wait in process until flush_interval seconds have passed
+    since the first of them, or max_batch are pending, and are then written together by one
+    commit(storage, docs) call. If a grouped commit fails, its documents are retried one at a
+    time, so a bad document fails only itself. add(..., wait=True) returns once its document
+    is committed (the durable acknowledgement); with wait=False it returns at once and a
+    failed commit is only logged. Pending documents are lost if the process dies before a
+    flush; flush() (called on shutdown) commits whatever is pending.
+    """
+
+    def __init__(self, name: str, commit, flush_interval: float, max_batch: int, max_pending: int):
+        self.name = name
+        self.commit = commit
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._pending: list = [] # (doc_id, data, waiter future or None), oldest first
+        self._has_pending: asyncio.Event | None = None
+        self._full: asyncio.Event | None = None
+        self._lock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+        self._flushes = 0
+        self._committed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._retried_batches = 0
+        self._last_flush_seconds = 0.0
+
+    def _start(self):
+        # Bound to the running loop, so started on first use rather than at import
+        if self._task is None:
+            self._has_pending = asyncio.Event()
+            self._full = asyncio.Event()
+            self._lock = asyncio.Lock()
+            # Started from inside a request: a fresh context keeps its route label off the flush's storage calls
+            self._task = contextvars.Context().run(asyncio.create_task, self._run())
+
+    async def add(self, doc_id: str, data: dict, wait: bool = True):
+        """Queues a document for the next commit.
+
+        With wait, returns once it is committed and raises the commit error if it failed.
+        """
+        self._start()
+        if len(self._pending) >= self.max_pending:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many pending writes, please retry",
+                headers={"Retry-After": "1"},
+            )
+        waiter = asyncio.get_running_loop().create_future() if wait else None
+        self._pending.append((doc_id, data, waiter))
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        if waiter is not None:
+            error = await waiter
+            if error is not None:
+                raise error
+
+    async def _run(self):
+        while True:
+            await self._has_pending.wait()
+            if not self._full.is_set():
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing write buffer {self.name}: {e}")
+
+    async def flush(self):
+        """Commits everything pending, at most max_batch documents per commit."""
+        if self._lock is None:
+            return # Never used
+        async with self._lock:
+            while self._pending:
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+                if not self._pending:
+                    self._has_pending.clear()
+                if len(self._pending) < self.max_batch:
+                    self._full.clear()
+                await self._commit(batch)
+
+    async def _commit(self, batch: list):
+        started = time.perf_counter()
+        errors = {}
+        try:
+            await self.commit(get_storage(), [(doc_id, data) for doc_id, data, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                errors[batch[0][0]] = e
+            else:
+                print(f"Write buffer {self.name} failed to commit {len(batch)} documents together, retrying one by one: {e}")
+                self._retried_batches += 1
+                for doc_id, data, _ in batch:
+                    try:
+                        await self.commit(get_storage(), [(doc_id, data)])
+                    except Exception as e:
+                        errors[doc_id] = e
+        for doc_id, error in errors.items():
+            print(f"Write buffer {self.name} failed to commit document {doc_id}: {error}")
+
+        self._flushes += 1
+        self._committed += len(batch) - len(errors)
+        self._failed += len(errors)
+        self._last_flush_seconds = time.perf_counter() - started
+        for doc_id, _, waiter in batch:
+            if waiter is not None and not waiter.done(): # Done if the waiting request was cancelled
+                waiter.set_result(errors.get(doc_id))
+
+    def stats(self) -> dict:
+        return {
+            "flush_interval_ms": self.flush_interval * 1000,
+            "max_batch": self.max_batch,
+            "max_pending": self.max_pending,
+            "pending": len(self._pending),
+            "flushes": self._flushes,
+            "committed": self._committed,
+            "failed": self._failed,
+            "rejected": self._rejected, # 503: max_pending reached
+            "retried_batches": self._retried_batches,
+            "avg_batch": round((self._committed + self._failed) / self._flushes, 1) if self._flushes else 0.0,
+            "last_flush_seconds": round(self._last_flush_seconds, 4),
+        }
+
+    async def shutdown(self):
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def create_buffer(name: str, commit, flush_interval: float, max_batch: int, max_pending: int) -> WriteBuffer:
+    """Creates a named write buffer; commit(storage, docs) writes a list of (doc_id, data) atomically."""
+    buffer = WriteBuffer(name, commit, flush_interval=flush_interval, max_batch=max_batch, max_pending=max_pending)
+    _buffers[name] = buffer
+    return buffer
+
+
+def buffer_stats() -> dict:
+    return {name: buffer.stats() for name, buffer in _buffers.items()}
+
+
+async def flush_buffers():
+    """Commits every buffer's pending documents and stops their flush tasks (on shutdown)."""
+    for buffer in _buffers.values():
+        try:
+            await buffer.shutdown()
+        except Exception as e:
+            print(f"Error flushing write buffer {buffer.name} on shutdown: {e}")
@@ -0,0 +1,170 @@
+import datetime
+from dataclasses import dataclass, field
+from fastapi import HTTPException
+
+from .. import config
+
+# Collections the routers read and write
+INPUTS = "student_inputs"
+PLANS = "student_plans"
+FEEDBACK = "student_feedback"
+PLAN_JOBS = "plan_jobs" # Plan-generation job status and results (see LocalJobBroker)
+
+
+@dataclass
+class Document:
+    id: str
+    data: dict
+
+
+@dataclass
+class UserRecord:
+    uid: str
+    email: str | None
+    display_name: str | None
+    email_verified: bool = False
+    creation_timestamp: int | None = None # Milliseconds since epoch, as Firebase Auth reports it
+    custom_claims: dict = field(default_factory=dict)
+
+
+class UserNotFoundError(Exception):
+    pass
+
+class EmailAlreadyExistsError(Exception):
+    pass
+
+
+def utc_naive(value):
+    """Returns a timezone-aware datetime as naive UTC (other values unchanged).
+
+    Firestore returns timestamps as aware UTC datetimes, while this process writes naive UTC
+    ones; normalizing lets the two be compared, ordered and hashed alike.
+    """
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class Storage:
+    """Everything the routers need from Firestore and Firebase Auth.
+
+    Documents are plain dicts. Queries by user always filter on "user_id" and return the
+    newest documents first by "created_at" (then by document ID, for equal timestamps),
+    mirroring the Firestore composite indexes.
+
+    Reads that take fields return only those fields (a projection; dotted paths select
+    nested fields), or the whole document when fields is None.
+    """
+
+    # --- Documents ---
+
+    def new_id(self, collection: str) -> str:
+        """Returns a fresh auto-generated document ID for collection (nothing is written)."""
+        raise NotImplementedError
+
+    async def get(self, collection: str, doc_id: str, fields: list[str] | None = None) -> Document | None:
+        raise NotImplementedError
+
+    async def get_many(self, collection: str, doc_ids: list[str], fields: list[str] | None = None) -> dict[str, Document]:
+        """Fetches several documents in one round-trip; missing IDs are absent from the result."""
+        raise NotImplementedError
+
+    async def query_by_user(self, collection: str, user_id: str, limit: int, start_after: tuple | None = None,
+                            fields: list[str] | None = None) -> list[Document]:
+        """Returns up to limit of the user's documents, newest created_at first.
+
+        start_after is the (created_at, doc_id) of the last document of the previous page.
+        """
+        raise NotImplementedError
+
+    async def create_many(self, collection: str, docs: list[tuple[str, dict]]) -> dict[str, Exception]:
+        """Creates (doc_id, data) documents with batched commits.
+
+        Returns {doc_id: error} for documents whose commit failed; the rest were written.
+        """
+        raise NotImplementedError
+
+    async def set(self, collection: str, doc_id: str, data: dict):
+        """Writes collection/doc_id, replacing any existing document (no read)."""
+        raise NotImplementedError
+
+    async def transact(self, collection: str, doc_id: str, mutate, creates: list[tuple[str, str, dict]] = (), increments=None) -> dict:
+        """Atomically replaces collection/doc_id with mutate(current_data_or_None).
+
+        The (collection, doc_id, data) documents in creates are created in the same
+        transaction. increments, if given, is called as increments(current, written) and
+        returns (collection, doc_id, deltas) counter updates to apply in the same
+        transaction as well (see increment()). Returns the data that was written.
+        """
+        raise NotImplementedError
+
+    async def transact_many(self, collection: str, updates: list[tuple], creates: list[tuple[str, str, dict]] = ()) -> dict[str, dict]:
+        """Like transact(), for several documents of collection in one transaction.
+
+        updates are (doc_id, mutate, increments or None), one per distinct doc_id; counter
+        updates to the same document are merged into one write. Returns {doc_id: written data}.
+        """
+        raise NotImplementedError
+
+    async def increment(self, collection: str, doc_id: str, deltas: dict):
+        """Atomically adds deltas to numeric fields of collection/doc_id, creating it if needed.
+
+        deltas may nest, e.g. {"total": 1, "by_status": {"Active": 1}}; missing fields start at 0.
+        """
+        raise NotImplementedError
+
+    async def warm_up(self):
+        """Opens connections and fetches credentials ahead of the first request (best effort)."""
+
+    # --- User directory (Firebase Auth) ---
+
+    async def create_user(self, email: str, password: str, display_name: str) -> UserRecord:
+        """Raises EmailAlreadyExistsError if the email is taken."""
+        raise NotImplementedError
+
+    async def get_user(self, uid: str) -> UserRecord:
+        """Raises UserNotFoundError."""
+        raise NotImplementedError
+
+    async def get_user_by_email(self, email: str) -> UserRecord:
+        """Raises UserNotFoundError."""
+        raise NotImplementedError
+
+    async def list_users(self, page_size: int, page_token: str | None = None) -> tuple[list[UserRecord], str | None]:
+        """Returns one page of users and the token for the next page (None on the last page)."""
+        raise NotImplementedError
+
+    async def set_custom_claims(self, uid: str, claims: dict):
+        raise NotImplementedError
+
+
+_storage: Storage | None = None
+
+
+def get_storage() -> Storage:
+    """Returns the process-wide storage backend selected by STORAGE_BACKEND (firestore|memory)."""
+    global _storage
+    if _storage is None:
+        if config.STORAGE_BACKEND == "memory":
+            from .memory_storage import MemoryStorage
+            _storage = MemoryStorage(latency_ms=config.MEMORY_STORAGE_LATENCY_MS)
+        elif config.STORAGE_BACKEND == "firestore":
+            try:
+                # Imported here: the Firebase SDK is the slowest import in the app and unused by the memory backend
+                from .firestore_storage import FirestoreStorage, init_firebase
+                _storage = FirestoreStorage(init_firebase())
+            except Exception as e:
+                print(f"Error initializing Firebase Admin SDK: {e}")
+                raise HTTPException(status_code=500, detail="Firestore client not initialized")
+        else:
+            raise ValueError(f"Unknown storage backend: {config.STORAGE_BACKEND}")
+        if config.METRICS_ENABLED:
+            from .instrumented import InstrumentedStorage
+            _storage = InstrumentedStorage(_storage)
+    return _storage
+
+
+def set_storage(storage: Storage | None):
+    """Replaces the process-wide storage backend (None resets to the configured one)."""
+    global _storage
+    _storage = storage
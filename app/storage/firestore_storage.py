@@ -0,0 +1,216 @@
+import asyncio
+import json
+import os
+
+import firebase_admin
+from firebase_admin import credentials, firestore, auth as firebase_auth
+
+from .. import config
+from ..services.executor import run_blocking # Keeps Firebase calls off the event loop
+from .base import Document, EmailAlreadyExistsError, Storage, UserNotFoundError, UserRecord
+
+
+def init_firebase():
+    """Initializes the Firebase Admin SDK (once per process) and returns a Firestore client."""
+    if not firebase_admin._apps:
+        firebase_service_account_json_str = os.getenv("FIREBASE_SERVICE_ACCOUNT_KEY_JSON")
+        if firebase_service_account_json_str:
+            # Load from environment variable (for Railway)
+            service_account_info = json.loads(firebase_service_account_json_str)
+            cred = credentials.Certificate(service_account_info)
+            print("Initializing Firebase Admin SDK from environment variable.")
+        else:
+            # Load from local file (for local development)
+            cred_path = os.path.join(os.path.dirname(__file__), "..", "..", "firebase-service-account-key.json")
+            if not os.path.exists(cred_path):
+                raise FileNotFoundError(f"Firebase service account key file not found at {cred_path} and FIREBASE_SERVICE_ACCOUNT_KEY_JSON env var is not set.")
+            cred = credentials.Certificate(cred_path)
+            print("Initializing Firebase Admin SDK from local file.")
+        firebase_admin.initialize_app(cred)
+        print("Firebase Admin SDK initialized successfully.")
+    return firestore.client()
+
+
+def _to_user_record(user_record) -> UserRecord:
+    return UserRecord(
+        uid=user_record.uid,
+        email=user_record.email,
+        display_name=user_record.display_name,
+        email_verified=user_record.email_verified,
+        creation_timestamp=user_record.user_metadata.creation_timestamp,
+        custom_claims=user_record.custom_claims or {},
+    )
+
+
+def _increments(deltas: dict) -> dict:
+    return {field: _increments(delta) if isinstance(delta, dict) else firestore.Increment(delta) for field, delta in deltas.items()}
+
+def _merge_deltas(target: dict, deltas: dict):
+    # A transaction writes each counter document once, with the sum of its increments
+    for field, delta in deltas.items():
+        if isinstance(delta, dict):
+            _merge_deltas(target.setdefault(field, {}), delta)
+        else:
+            target[field] = target.get(field, 0) + delta
+
+
+class FirestoreStorage(Storage):
+    """Firestore documents plus the Firebase Auth user directory.
+
+    The Admin SDK is synchronous, so every call runs on the bounded executor.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    # --- Documents ---
+
+    def new_id(self, collection: str) -> str:
+        return self.db.collection(collection).document().id
+
+    async def get(self, collection: str, doc_id: str, fields: list[str] | None = None) -> Document | None:
+        doc = await run_blocking(self.db.collection(collection).document(doc_id).get, field_paths=fields)
+        return Document(doc.id, doc.to_dict()) if doc.exists else None
+
+    async def get_many(self, collection: str, doc_ids: list[str], fields: list[str] | None = None) -> dict[str, Document]:
+        if not doc_ids:
+            return {}
+        refs = [self.db.collection(collection).document(doc_id) for doc_id in doc_ids]
+        docs = await run_blocking(lambda: list(self.db.get_all(refs, field_paths=fields)))
+        return {doc.id: Document(doc.id, doc.to_dict()) for doc in docs if doc.exists}
+
+    async def query_by_user(self, collection: str, user_id: str, limit: int, start_after: tuple | None = None,
+                            fields: list[str] | None = None) -> list[Document]:
+        # Ordering by document ID as well makes the cursor exact when timestamps are equal; the
+        # (user_id, created_at desc) index already covers it
+        query = (
+            self.db.collection(collection).where("user_id", "==", user_id)
+            .order_by("created_at", direction=firestore.Query.DESCENDING)
+            .order_by("__name__", direction=firestore.Query.DESCENDING)
+        )
+        if fields is not None:
+            query = query.select(fields) # Only these fields are sent and decoded
+        if start_after is not None:
+            created_at, doc_id = start_after
+            query = query.start_after({"created_at": created_at, "__name__": doc_id})
+        query = query.limit(limit)
+        docs = await run_blocking(lambda: list(query.stream()))
+        return [Document(doc.id, doc.to_dict()) for doc in docs]
+
+    def _commit_in_batches(self, collection: str, docs: list[tuple[str, dict]]) -> dict[str, Exception]:
+        errors = {}
+        for start in range(0, len(docs), config.WRITE_BATCH_SIZE):
+            chunk = docs[start:start + config.WRITE_BATCH_SIZE]
+            batch = self.db.batch()
+            for doc_id, data in chunk:
+                batch.create(self.db.collection(collection).document(doc_id), data)
+            try:
+                batch.commit()
+            except Exception as e:
+                print(f"Error committing batch to {collection}: {e}")
+                errors.update({doc_id: e for doc_id, _ in chunk})
+        return errors
+
+    async def create_many(self, collection: str, docs: list[tuple[str, dict]]) -> dict[str, Exception]:
+        return await run_blocking(self._commit_in_batches, collection, docs)
+
+    async def set(self, collection: str, doc_id: str, data: dict):
+        await run_blocking(self.db.collection(collection).document(doc_id).set, data)
+
+    def _transact(self, collection: str, doc_id: str, mutate, creates, increments) -> dict:
+        ref = self.db.collection(collection).document(doc_id)
+
+        @firestore.transactional
+        def write(transaction):
+            snapshot = ref.get(transaction=transaction)
+            current = snapshot.to_dict() if snapshot.exists else None
+            data = mutate(current)
+            for create_collection, create_id, create_data in creates:
+                transaction.create(self.db.collection(create_collection).document(create_id), create_data)
+            transaction.set(ref, data)
+            # Increment transforms need no read, so counter documents add no transaction contention
+            for counter_collection, counter_id, deltas in (increments(current, data) if increments else ()):
+                transaction.set(self.db.collection(counter_collection).document(counter_id), _increments(deltas), merge=True)
+            return data
+
+        return write(self.db.transaction())
+
+    async def transact(self, collection: str, doc_id: str, mutate, creates: list[tuple[str, str, dict]] = (), increments=None) -> dict:
+        return await run_blocking(self._transact, collection, doc_id, mutate, creates, increments)
+
+    def _transact_many(self, collection: str, updates: list[tuple], creates) -> dict[str, dict]:
+        refs = {doc_id: self.db.collection(collection).document(doc_id) for doc_id, _, _ in updates}
+
+        @firestore.transactional
+        def write(transaction):
+            snapshots = {snapshot.id: snapshot for snapshot in transaction.get_all(list(refs.values()))}
+            written, counters = {}, {}
+            for doc_id, mutate, increments in updates:
+                snapshot = snapshots.get(doc_id)
+                current = snapshot.to_dict() if snapshot is not None and snapshot.exists else None
+                data = mutate(current)
+                transaction.set(refs[doc_id], data)
+                written[doc_id] = data
+                for counter_collection, counter_id, deltas in (increments(current, data) if increments else ()):
+                    _merge_deltas(counters.setdefault((counter_collection, counter_id), {}), deltas)
+            for create_collection, create_id, create_data in creates:
+                transaction.create(self.db.collection(create_collection).document(create_id), create_data)
+            for (counter_collection, counter_id), deltas in counters.items():
+                transaction.set(self.db.collection(counter_collection).document(counter_id), _increments(deltas), merge=True)
+            return written
+
+        return write(self.db.transaction())
+
+    async def transact_many(self, collection: str, updates: list[tuple], creates: list[tuple[str, str, dict]] = ()) -> dict[str, dict]:
+        return await run_blocking(self._transact_many, collection, updates, creates)
+
+    async def increment(self, collection: str, doc_id: str, deltas: dict):
+        ref = self.db.collection(collection).document(doc_id)
+        await run_blocking(ref.set, _increments(deltas), merge=True)
+
+    async def warm_up(self):
+        # The first Firestore call opens the gRPC channel and the first Auth call fetches an OAuth
+        # token; a document read and a one-user listing pay both before traffic arrives
+        await asyncio.gather(
+            run_blocking(self.db.collection("_warm_up").document("_").get), # Missing documents are fine
+            run_blocking(firebase_auth.list_users, max_results=1),
+        )
+
+    # --- User directory (Firebase Auth) ---
+
+    async def create_user(self, email: str, password: str, display_name: str) -> UserRecord:
+        try:
+            user_record = await run_blocking(
+                firebase_auth.create_user,
+                email=email,
+                password=password,
+                display_name=display_name,
+                email_verified=False, # Or True if you implement verification
+            )
+        except firebase_auth.EmailAlreadyExistsError as e:
+            raise EmailAlreadyExistsError(str(e))
+        return _to_user_record(user_record)
+
+    async def get_user(self, uid: str) -> UserRecord:
+        try:
+            return _to_user_record(await run_blocking(firebase_auth.get_user, uid))
+        except firebase_auth.UserNotFoundError as e:
+            raise UserNotFoundError(str(e))
+
+    async def get_user_by_email(self, email: str) -> UserRecord:
+        try:
+            return _to_user_record(await run_blocking(firebase_auth.get_user_by_email, email))
+        except firebase_auth.UserNotFoundError as e:
+            raise UserNotFoundError(str(e))
+
+    async def list_users(self, page_size: int, page_token: str | None = None) -> tuple[list[UserRecord], str | None]:
+        def fetch_page():
+            page = firebase_auth.list_users(page_token=page_token, max_results=page_size)
+            return [_to_user_record(user_record) for user_record in page.users], page.next_page_token or None
+        return await run_blocking(fetch_page)
+
+    async def set_custom_claims(self, uid: str, claims: dict):
+        try:
+            await run_blocking(firebase_auth.set_custom_user_claims, uid, claims)
+        except firebase_auth.UserNotFoundError as e:
+            raise UserNotFoundError(str(e))
@@ -0,0 +1,79 @@
+import time
+
+from ..services.metrics import STORAGE_CALL_DURATION, STORAGE_CALL_ERRORS, current_route
+from .base import Document, EmailAlreadyExistsError, Storage, UserNotFoundError, UserRecord
+
+AUTH = "auth" # Collection label for Firebase Auth user-directory calls
+
+# Outcomes callers expect and handle; not counted as errors
+_EXPECTED_ERRORS = (UserNotFoundError, EmailAlreadyExistsError)
+
+
+class InstrumentedStorage(Storage):
+    """Wraps a storage backend and records latency and errors per route, operation and collection."""
+
+    def __init__(self, inner: Storage):
+        self.inner = inner
+
+    async def _observe(self, operation: str, collection: str, call):
+        labels = (current_route(), operation, collection)
+        started = time.perf_counter()
+        try:
+            return await call
+        except _EXPECTED_ERRORS:
+            raise
+        except Exception:
+            STORAGE_CALL_ERRORS.inc(labels)
+            raise
+        finally:
+            STORAGE_CALL_DURATION.observe(labels, time.perf_counter() - started)
+
+    # --- Documents ---
+
+    def new_id(self, collection: str) -> str:
+        return self.inner.new_id(collection)
+
+    async def get(self, collection: str, doc_id: str, fields: list[str] | None = None) -> Document | None:
+        return await self._observe("get", collection, self.inner.get(collection, doc_id, fields))
+
+    async def get_many(self, collection: str, doc_ids: list[str], fields: list[str] | None = None) -> dict[str, Document]:
+        return await self._observe("get_many", collection, self.inner.get_many(collection, doc_ids, fields))
+
+    async def query_by_user(self, collection: str, user_id: str, limit: int, start_after: tuple | None = None,
+                            fields: list[str] | None = None) -> list[Document]:
+        return await self._observe("query_by_user", collection, self.inner.query_by_user(collection, user_id, limit, start_after, fields))
+
+    async def create_many(self, collection: str, docs: list[tuple[str, dict]]) -> dict[str, Exception]:
+        return await self._observe("create_many", collection, self.inner.create_many(collection, docs))
+
+    async def set(self, collection: str, doc_id: str, data: dict):
+        return await self._observe("set", collection, self.inner.set(collection, doc_id, data))
+
+    async def transact(self, collection: str, doc_id: str, mutate, creates: list[tuple[str, str, dict]] = (), increments=None) -> dict:
+        return await self._observe("transact", collection, self.inner.transact(collection, doc_id, mutate, creates, increments))
+
+    async def transact_many(self, collection: str, updates: list[tuple], creates: list[tuple[str, str, dict]] = ()) -> dict[str, dict]:
+        return await self._observe("transact_many", collection, self.inner.transact_many(collection, updates, creates))
+
+    async def increment(self, collection: str, doc_id: str, deltas: dict):
+        return await self._observe("increment", collection, self.inner.increment(collection, doc_id, deltas))
+
+    async def warm_up(self):
+        return await self._observe("warm_up", "startup", self.inner.warm_up())
+
+    # --- User directory ---
+
+    async def create_user(self, email: str, password: str, display_name: str) -> UserRecord:
+        return await self._observe("create_user", AUTH, self.inner.create_user(email, password, display_name))
+
+    async def get_user(self, uid: str) -> UserRecord:
+        return await self._observe("get_user", AUTH, self.inner.get_user(uid))
+
+    async def get_user_by_email(self, email: str) -> UserRecord:
+        return await self._observe("get_user_by_email", AUTH, self.inner.get_user_by_email(email))
+
+    async def list_users(self, page_size: int, page_token: str | None = None) -> tuple[list[UserRecord], str | None]:
+        return await self._observe("list_users", AUTH, self.inner.list_users(page_size, page_token))
+
+    async def set_custom_claims(self, uid: str, claims: dict):
+        return await self._observe("set_custom_claims", AUTH, self.inner.set_custom_claims(uid, claims))
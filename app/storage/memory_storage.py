@@ -0,0 +1,194 @@
+import asyncio
+import bisect
+import copy
+import datetime
+import uuid
+
+from .base import Document, EmailAlreadyExistsError, Storage, UserNotFoundError, UserRecord
+
+
+def _project(data: dict, fields: list[str] | None) -> dict:
+    """Copies data, keeping only fields (dotted paths reach into maps) like a Firestore select()."""
+    if fields is None:
+        return copy.deepcopy(data)
+    projected = {}
+    for path in fields:
+        *parents, leaf = path.split(".")
+        source = data
+        for key in parents:
+            source = source.get(key) if isinstance(source, dict) else None
+        if not isinstance(source, dict) or leaf not in source:
+            continue # Missing fields are left out, not set to None
+        target = projected
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[leaf] = copy.deepcopy(source[leaf])
+    return projected
+
+
+class MemoryStorage(Storage):
+    """In-process storage with the same query semantics as FirestoreStorage.
+
+    Meant for local runs and load tests: no network, no credentials. Documents are
+    copied on the way in and out so callers can't mutate stored state. latency_ms adds
+    an artificial delay to every call to approximate Firestore round-trips.
+    """
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self._collections: dict = {} # collection -> {doc_id: data}
+        self._by_user: dict = {} # (collection, user_id) -> sorted [(created_at, doc_id)]
+        self._users: dict = {} # uid -> UserRecord
+        self._uids_by_email: dict = {}
+        self._sorted_uids: list = []
+
+    async def _round_trip(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _write(self, collection: str, doc_id: str, data: dict):
+        docs = self._collections.setdefault(collection, {})
+        previous = docs.get(doc_id)
+        if previous is not None and "user_id" in previous:
+            entries = self._by_user.get((collection, previous["user_id"]), [])
+            entries.remove((previous.get("created_at"), doc_id))
+        docs[doc_id] = copy.deepcopy(data)
+        if "user_id" in data:
+            bisect.insort(self._by_user.setdefault((collection, data["user_id"]), []), (data.get("created_at"), doc_id))
+
+    # --- Documents ---
+
+    def new_id(self, collection: str) -> str:
+        return uuid.uuid4().hex[:20] # Same length as Firestore auto-IDs
+
+    async def get(self, collection: str, doc_id: str, fields: list[str] | None = None) -> Document | None:
+        await self._round_trip()
+        data = self._collections.get(collection, {}).get(doc_id)
+        return Document(doc_id, _project(data, fields)) if data is not None else None
+
+    async def get_many(self, collection: str, doc_ids: list[str], fields: list[str] | None = None) -> dict[str, Document]:
+        await self._round_trip()
+        docs = self._collections.get(collection, {})
+        return {doc_id: Document(doc_id, _project(docs[doc_id], fields)) for doc_id in doc_ids if doc_id in docs}
+
+    async def query_by_user(self, collection: str, user_id: str, limit: int, start_after: tuple | None = None,
+                            fields: list[str] | None = None) -> list[Document]:
+        await self._round_trip()
+        docs = self._collections.get(collection, {})
+        entries = self._by_user.get((collection, user_id), [])
+        if start_after is not None:
+            entries = entries[:bisect.bisect_left(entries, tuple(start_after))] # Strictly older than the cursor
+        newest = entries[-limit:][::-1] if limit > 0 else []
+        return [Document(doc_id, _project(docs[doc_id], fields)) for _, doc_id in newest]
+
+    async def create_many(self, collection: str, docs: list[tuple[str, dict]]) -> dict[str, Exception]:
+        await self._round_trip()
+        errors = {}
+        existing = self._collections.get(collection, {})
+        for doc_id, data in docs:
+            if doc_id in existing:
+                errors[doc_id] = ValueError(f"Document {collection}/{doc_id} already exists")
+            else:
+                self._write(collection, doc_id, data)
+        return errors
+
+    async def set(self, collection: str, doc_id: str, data: dict):
+        await self._round_trip()
+        self._write(collection, doc_id, data)
+
+    async def transact(self, collection: str, doc_id: str, mutate, creates: list[tuple[str, str, dict]] = (), increments=None) -> dict:
+        await self._round_trip()
+        # No awaits from here on, so the read-modify-write is atomic on the event loop
+        for create_collection, create_id, _ in creates:
+            if create_id in self._collections.get(create_collection, {}):
+                raise ValueError(f"Document {create_collection}/{create_id} already exists")
+        current = self._collections.get(collection, {}).get(doc_id)
+        data = mutate(copy.deepcopy(current) if current is not None else None)
+        counter_updates = increments(current, data) if increments else ()
+        for create_collection, create_id, create_data in creates:
+            self._write(create_collection, create_id, create_data)
+        self._write(collection, doc_id, data)
+        for counter_collection, counter_id, deltas in counter_updates:
+            self._increment(counter_collection, counter_id, deltas)
+        return copy.deepcopy(data)
+
+    async def transact_many(self, collection: str, updates: list[tuple], creates: list[tuple[str, str, dict]] = ()) -> dict[str, dict]:
+        await self._round_trip()
+        for create_collection, create_id, _ in creates:
+            if create_id in self._collections.get(create_collection, {}):
+                raise ValueError(f"Document {create_collection}/{create_id} already exists")
+        # Every mutation runs before anything is written, so one that raises leaves no partial commit
+        staged = []
+        for doc_id, mutate, increments in updates:
+            current = self._collections.get(collection, {}).get(doc_id)
+            data = mutate(copy.deepcopy(current) if current is not None else None)
+            staged.append((doc_id, data, increments(current, data) if increments else ()))
+        for create_collection, create_id, create_data in creates:
+            self._write(create_collection, create_id, create_data)
+        written = {}
+        for doc_id, data, counter_updates in staged:
+            self._write(collection, doc_id, data)
+            for counter_collection, counter_id, deltas in counter_updates:
+                self._increment(counter_collection, counter_id, deltas)
+            written[doc_id] = copy.deepcopy(data)
+        return written
+
+    def _increment(self, collection: str, doc_id: str, deltas: dict):
+        def add(target: dict, deltas: dict):
+            for field, delta in deltas.items():
+                if isinstance(delta, dict):
+                    add(target.setdefault(field, {}), delta)
+                else:
+                    target[field] = target.get(field, 0) + delta
+        data = copy.deepcopy(self._collections.get(collection, {}).get(doc_id) or {})
+        add(data, deltas)
+        self._write(collection, doc_id, data)
+
+    async def increment(self, collection: str, doc_id: str, deltas: dict):
+        await self._round_trip()
+        self._increment(collection, doc_id, deltas)
+
+    # --- User directory ---
+
+    async def create_user(self, email: str, password: str, display_name: str) -> UserRecord:
+        await self._round_trip()
+        if email in self._uids_by_email:
+            raise EmailAlreadyExistsError(f"The user with the provided email already exists ({email})")
+        created_at = datetime.datetime.now(datetime.timezone.utc)
+        user_record = UserRecord(
+            uid=uuid.uuid4().hex[:28], # Same length as Firebase Auth UIDs
+            email=email,
+            display_name=display_name,
+            creation_timestamp=int(created_at.timestamp() * 1000),
+        )
+        self._users[user_record.uid] = user_record
+        self._uids_by_email[email] = user_record.uid
+        bisect.insort(self._sorted_uids, user_record.uid)
+        return copy.deepcopy(user_record)
+
+    async def get_user(self, uid: str) -> UserRecord:
+        await self._round_trip()
+        if uid not in self._users:
+            raise UserNotFoundError(f"No user record found for the provided user ID: {uid}")
+        return copy.deepcopy(self._users[uid])
+
+    async def get_user_by_email(self, email: str) -> UserRecord:
+        await self._round_trip()
+        if email not in self._uids_by_email:
+            raise UserNotFoundError(f"No user record found for the provided email: {email}")
+        return copy.deepcopy(self._users[self._uids_by_email[email]])
+
+    async def list_users(self, page_size: int, page_token: str | None = None) -> tuple[list[UserRecord], str | None]:
+        await self._round_trip()
+        # Like Firebase Auth, pages are ordered by UID and the token is the last UID returned
+        uids = self._sorted_uids
+        start = bisect.bisect_right(uids, page_token) if page_token else 0
+        page = uids[start:start + page_size]
+        next_page_token = page[-1] if start + page_size < len(uids) else None
+        return [copy.deepcopy(self._users[uid]) for uid in page], next_page_token
+
+    async def set_custom_claims(self, uid: str, claims: dict):
+        await self._round_trip()
+        if uid not in self._users:
+            raise UserNotFoundError(f"No user record found for the provided user ID: {uid}")
+        self._users[uid].custom_claims = dict(claims or {})
@@ -0,0 +1,247 @@
+"""Route-level load test for the SURI AI backend.
+
+Drives every endpoint in-process (ASGI, no network) against the in-memory storage backend,
+so the numbers measure this service's own overhead. Reports throughput and p50/p95/p99
+per route, and can compare against a recorded baseline to catch regressions before deploy.
+
+Usage (from the repository root):
+    python -m benchmarks.load_test                                  # run and print results
+    python -m benchmarks.load_test --save-baseline benchmarks/baseline.json
+    python -m benchmarks.load_test --baseline benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.load_test --routes "GET /student/plan" --concurrency 64 --requests 5000
+    python -m benchmarks.load_test --budget "GET /student/plan=20"  # fail if p99 > 20 ms
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+PASSWORD = "benchmark-password"
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Context:
+    """Users, tokens and plans created during setup, shared by every scenario."""
+
+    def __init__(self):
+        self.users = [] # [(uid, email, headers)]
+        self.admin_headers = None
+        self.plan_ids = {} # uid -> plan id
+        self.counter = 0
+
+    def user(self, i: int):
+        return self.users[i % len(self.users)]
+
+    def unique(self) -> int:
+        self.counter += 1
+        return self.counter
+
+
+# Each scenario maps a request number to (method, path, request kwargs, expected status)
+SCENARIOS = {
+    "POST /auth/register": lambda ctx, i: (
+        "POST", "/auth/register",
+        {"json": {"email": f"load{ctx.unique()}@bench.example.com", "name": "Load", "password": PASSWORD}}, 200,
+    ),
+    "POST /auth/login": lambda ctx, i: (
+        "POST", "/auth/login", {"data": {"username": ctx.user(i)[1], "password": PASSWORD}}, 200,
+    ),
+    "POST /student/input": lambda ctx, i: (
+        "POST", "/student/input",
+        {"json": {"goals": ["Speak confidently"], "struggles": "Listening"}, "headers": ctx.user(i)[2]}, 200,
+    ),
+    "GET /student/plan": lambda ctx, i: (
+        "GET", "/student/plan", {"headers": ctx.user(i)[2]}, 200,
+    ),
+    "POST /student/plan": lambda ctx, i: (
+        "POST", "/student/plan", {"headers": ctx.user(i)[2]}, 202,
+    ),
+    "POST /student/feedback": lambda ctx, i: (
+        "POST", "/student/feedback",
+        {"json": {"rating": 4, "comments": "ok", "plan_id": ctx.plan_ids[ctx.user(i)[0]], "user_id": ctx.user(i)[0]},
+         "headers": ctx.user(i)[2]}, 200,
+    ),
+    "GET /admin/users": lambda ctx, i: (
+        "GET", "/admin/users", {"params": {"page_size": 100}, "headers": ctx.admin_headers}, 200,
+    ),
+    "GET /admin/users/{id}": lambda ctx, i: (
+        "GET", f"/admin/users/{ctx.user(i)[0]}", {"headers": ctx.admin_headers}, 200,
+    ),
+}
+
+
+async def setup(client, users: int) -> Context:
+    from app.storage.base import get_storage
+
+    ctx = Context()
+    for n in range(users):
+        email = f"student{n}@bench.example.com"
+        response = await client.post("/auth/register", json={"email": email, "name": f"Student {n}", "password": PASSWORD})
+        response.raise_for_status()
+        uid = response.json()["id"]
+        if n == 0:
+            await get_storage().set_custom_claims(uid, {"admin": True})
+        response = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        ctx.users.append((uid, email, headers))
+
+        response = await client.post("/student/input", json={"goals": ["Greetings"], "struggles": "Grammar"}, headers=headers)
+        response.raise_for_status()
+        job = (await client.post("/student/plan", headers=headers)).json()
+        while job["status"] in ("queued", "running"):
+            await asyncio.sleep(0.005)
+            job = (await client.get(f"/student/plan/jobs/{job['job_id']}", headers=headers)).json()
+        if job["status"] != "succeeded":
+            raise RuntimeError(f"Plan generation failed during setup: {job}")
+        ctx.plan_ids[uid] = job["plan"]["id"]
+    ctx.admin_headers = ctx.users[0][2]
+    return ctx
+
+
+async def run_route(client, ctx: Context, route: str, requests: int, concurrency: int) -> dict:
+    scenario = SCENARIOS[route]
+    latencies = []
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal errors, next_request
+        while next_request < requests:
+            i = next_request
+            next_request += 1
+            method, path, kwargs, expected_status = scenario(ctx, i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                ok = response.status_code == expected_status
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, budgets: dict) -> list:
+    """Returns human-readable failures: regressions against the baseline, budget overruns, errors."""
+    failures = []
+    for route, result in results.items():
+        if result["errors"]:
+            failures.append(f"{route}: {result['errors']} failed requests")
+        if route in budgets and result["p99_ms"] > budgets[route]:
+            failures.append(f"{route}: p99 {result['p99_ms']} ms exceeds budget {budgets[route]} ms")
+        recorded = baseline.get(route)
+        if not recorded:
+            continue
+        if result["p95_ms"] > recorded["p95_ms"] * (1 + threshold):
+            failures.append(f"{route}: p95 {result['p95_ms']} ms vs baseline {recorded['p95_ms']} ms (+{threshold:.0%} allowed)")
+        if result["throughput_rps"] < recorded["throughput_rps"] * (1 - threshold):
+            failures.append(f"{route}: {result['throughput_rps']} req/s vs baseline {recorded['throughput_rps']} req/s (-{threshold:.0%} allowed)")
+    return failures
+
+
+def print_table(results: dict):
+    print(f"{'route':<24} {'req':>7} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, r in results.items():
+        print(f"{route:<24} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+
+
+async def main_async(args) -> int:
+    import httpx
+    from app.main import app
+
+    routes = args.routes or list(SCENARIOS)
+    unknown = [route for route in routes if route not in SCENARIOS]
+    if unknown:
+        print(f"Unknown routes: {unknown}. Choose from: {list(SCENARIOS)}")
+        return 2
+    budgets = {}
+    for budget in args.budget:
+        route, _, ms = budget.rpartition("=")
+        budgets[route] = float(ms)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        # The app logs every write; keep that out of the report unless asked for
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        results = {}
+        with quiet:
+            ctx = await setup(client, args.users)
+            for route in routes:
+                if args.warmup:
+                    await run_route(client, ctx, route, args.warmup, args.concurrency)
+                results[route] = await run_route(client, ctx, route, args.requests, args.concurrency)
+
+    print(f"{args.requests} requests per route, concurrency {args.concurrency}, {args.users} users, "
+          f"storage latency {os.environ.get('MEMORY_STORAGE_LATENCY_MS', '0')} ms")
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failures = compare(results, baseline, args.threshold, budgets)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Route-level load test with latency budgets.")
+    parser.add_argument("--routes", nargs="*", help="Routes to run (default: all), e.g. 'GET /student/plan'")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent in-flight requests")
+    parser.add_argument("--users", type=int, default=20, help="Students created during setup")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per route before measuring")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Artificial storage latency per call")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed regression vs baseline (0.25 = 25%%)")
+    parser.add_argument("--budget", action="append", default=[], help="Absolute p99 budget, ROUTE=MS (repeatable)")
+    parser.add_argument("--save-baseline", help="Write results as the new baseline JSON")
+    parser.add_argument("--output", help="Write results JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own log output")
+    args = parser.parse_args(argv)
+
+    # Must be set before the app is imported: the storage backend is chosen from the environment
+    os.environ["STORAGE_BACKEND"] = "memory"
+    # A few benchmark users send every request, which the per-user admission limits would mostly shed
+    os.environ.setdefault("ADMISSION_ENABLED", "false")
+    os.environ["MEMORY_STORAGE_LATENCY_MS"] = str(args.latency_ms)
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
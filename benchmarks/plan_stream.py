@@ -0,0 +1,155 @@
+"""Time to first byte and to the whole plan: GET /student/plan/stream vs the POST /student/plan job.
+
+Runs in-process against the memory backend with the stub plan generator, which sleeps
+--section-delay-ms before each of the plan's five sections to stand in for a model.
+  * stream: first byte is the first section's event, done is the final "plan" event.
+  * job: first byte is the 202 with the job ID (no plan content yet), done is the poll
+    that returns the plan (polled every --poll-ms, as a client would).
+
+httpx's ASGI transport buffers whole responses, so the stream is read by calling the app
+directly and timing each body chunk.
+
+Usage (from the repository root):
+    python -m benchmarks.plan_stream
+    python -m benchmarks.plan_stream --section-delay-ms 200 --requests 20 --concurrency 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.load_test import percentile, setup
+
+
+async def read_stream(app, path: str, headers: dict) -> tuple[int, float, float, bytes]:
+    """Sends a GET straight to the ASGI app; returns (status, first body chunk s, last chunk s, body)."""
+    url = urlsplit(path)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": url.path, "raw_path": url.path.encode(), "query_string": url.query.encode(),
+        "root_path": "", "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    finished = asyncio.Event()
+    request_sent = False
+    status, first, last, chunks = 0, 0.0, 0.0, []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait() # The client stays connected until the response is complete
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, first, last
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            last = time.perf_counter() - started
+            first = first or last
+            chunks.append(message["body"])
+
+    started = time.perf_counter()
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    return status, first, last, b"".join(chunks)
+
+
+async def run_stream(app, ctx, requests: int, concurrency: int) -> tuple[list, list]:
+    firsts, dones = [], []
+
+    async def one(i: int):
+        status, first, done, body = await read_stream(app, "/student/plan/stream", ctx.user(i)[2])
+        if status != 200 or b"event: plan\n" not in body:
+            raise RuntimeError(f"Plan stream failed ({status}): {body[-200:]!r}")
+        firsts.append(first)
+        dones.append(done)
+
+    await run_concurrently(one, requests, concurrency)
+    return firsts, dones
+
+
+async def run_job(client, ctx, requests: int, concurrency: int, poll: float) -> tuple[list, list]:
+    firsts, dones = [], []
+
+    async def one(i: int):
+        headers = ctx.user(i)[2]
+        started = time.perf_counter()
+        response = await client.post("/student/plan", headers=headers)
+        firsts.append(time.perf_counter() - started)
+        job = response.json()
+        while job["status"] in ("queued", "running"):
+            await asyncio.sleep(poll)
+            job = (await client.get(f"/student/plan/jobs/{job['job_id']}", headers=headers)).json()
+        if job["status"] != "succeeded":
+            raise RuntimeError(f"Plan job failed: {job}")
+        dones.append(time.perf_counter() - started)
+
+    await run_concurrently(one, requests, concurrency)
+    return firsts, dones
+
+
+async def run_concurrently(one, requests: int, concurrency: int):
+    next_request = 0
+
+    async def worker():
+        nonlocal next_request
+        while next_request < requests:
+            i = next_request
+            next_request += 1
+            await one(i)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def print_row(name: str, firsts: list, dones: list):
+    firsts, dones = sorted(firsts), sorted(dones)
+    ms = lambda values, pct: percentile(values, pct) * 1000
+    print(f"{name:<8} {ms(firsts, 50):>12.1f} {ms(firsts, 95):>12.1f} {ms(dones, 50):>11.1f} {ms(dones, 95):>11.1f}")
+
+
+async def run(args):
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ctx = await setup(client, args.users)
+            stream = await run_stream(app, ctx, args.requests, args.concurrency)
+            job = await run_job(client, ctx, args.requests, args.concurrency, args.poll_ms / 1000)
+    print(f"{args.section_delay_ms:g} ms per section, {args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'':<8} {'first p50 ms':>12} {'first p95 ms':>12} {'done p50 ms':>11} {'done p95 ms':>11}")
+    print_row("stream", *stream)
+    print_row("job", *job)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Streamed vs job-based plan generation latency.")
+    parser.add_argument("--section-delay-ms", type=float, default=100, help="Stub delay before each plan section")
+    parser.add_argument("--requests", type=int, default=20, help="Plans generated per mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent in-flight requests")
+    parser.add_argument("--users", type=int, default=8, help="Students created during setup")
+    parser.add_argument("--poll-ms", type=float, default=250, help="Job polling interval")
+    args = parser.parse_args(argv)
+
+    # Must be set before the app is imported: the backends are chosen from the environment
+    os.environ["STORAGE_BACKEND"] = "memory"
+    os.environ["PLAN_GENERATOR"] = "stub"
+    os.environ["PLAN_STUB_SECTION_DELAY_MS"] = str(args.section_delay_ms)
+    # A few benchmark users send every request, which the per-user admission limits would mostly shed
+    os.environ.setdefault("ADMISSION_ENABLED", "false")
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Throughput scaling of the multi-process serving mode as workers are added.
+
+Starts the real server (gunicorn with app/gunicorn_conf.py, or uvicorn --workers) on the
+in-memory storage backend for each worker count, drives it over HTTP from several client
+processes, and reports throughput and latency per worker count.
+
+The memory backend keeps separate data in each worker, so only routes that don't depend on
+earlier requests are driven: "GET /" (framework overhead) and "POST /auth/register"
+(validation, a storage write and a stats counter update).
+
+Usage (from the repository root; needs gunicorn, or use --server uvicorn):
+    python -m benchmarks.scaling                                  # 1, 2, 4 ... up to the CPU count
+    python -m benchmarks.scaling --workers 1 2 4 8 --duration 15 --clients 8
+    python -m benchmarks.scaling --server uvicorn --latency-ms 5
+
+Run it on a machine with at least as many cores as the largest worker count plus the
+client processes, or the clients become the bottleneck.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+from app.gunicorn_conf import available_cpus # Same CPU count the server derives its workers from
+from benchmarks.load_test import percentile
+
+ROUTES = {
+    "GET /": lambda n: ("GET", "/", {}),
+    "POST /auth/register": lambda n: (
+        "POST", "/auth/register", {"json": {"email": f"scale{n}@bench.example.com", "name": "Scale", "password": "benchmark-password"}},
+    ),
+}
+
+
+def start_server(server: str, workers: int, port: int, latency_ms: float) -> subprocess.Popen:
+    env = dict(os.environ, STORAGE_BACKEND="memory", MEMORY_STORAGE_LATENCY_MS=str(latency_ms),
+               WEB_CONCURRENCY=str(workers), PORT=str(port),
+               ALLOW_PER_WORKER_STATE="true") # Per-worker memory data is fine for the routes driven here
+    if server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "app/gunicorn_conf.py", "app.main:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers)]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30):
+    import httpx
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+
+async def drive(base_url: str, route: str, duration: float, concurrency: int, client_id: int) -> tuple:
+    import httpx
+    scenario = ROUTES[route]
+    latencies, errors, counter = [], 0, 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors, counter
+            while time.monotonic() < deadline:
+                counter += 1
+                method, path, kwargs = scenario(f"{client_id}-{counter}-{time.time_ns()}")
+                started = time.perf_counter()
+                try:
+                    ok = (await client.request(method, path, **kwargs)).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - started)
+                errors += not ok
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(args) -> tuple:
+    return asyncio.run(drive(*args))
+
+
+def run(server: str, workers: int, route: str, args) -> dict:
+    port = args.port
+    base_url = f"http://127.0.0.1:{port}"
+    process = start_server(server, workers, port, args.latency_ms)
+    try:
+        asyncio.run(wait_until_ready(base_url))
+        with multiprocessing.Pool(args.clients) as pool:
+            pool.map(client_process, [(base_url, route, 1, args.concurrency, n) for n in range(args.clients)]) # Warm-up
+            results = pool.map(client_process, [(base_url, route, args.duration, args.concurrency, n) for n in range(args.clients)])
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "throughput_rps": round(len(latencies) / args.duration, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Throughput scaling across server worker counts.")
+    parser.add_argument("--server", choices=["gunicorn", "uvicorn"], default="gunicorn")
+    parser.add_argument("--workers", type=int, nargs="*", help="Worker counts to run (default: powers of two up to the CPU count)")
+    parser.add_argument("--routes", nargs="*", default=list(ROUTES), choices=list(ROUTES))
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per measurement")
+    parser.add_argument("--clients", type=int, default=4, help="Client processes generating load")
+    parser.add_argument("--concurrency", type=int, default=32, help="In-flight requests per client process")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Artificial storage latency per call")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    worker_counts = args.workers
+    if not worker_counts:
+        cpus = available_cpus()
+        worker_counts = [2 ** n for n in range(cpus.bit_length()) if 2 ** n <= cpus]
+        if worker_counts[-1] != cpus:
+            worker_counts.append(cpus)
+
+    print(f"{args.server}, {args.clients} client processes x {args.concurrency} in flight, "
+          f"{args.duration:g}s per run, storage latency {args.latency_ms:g} ms, {available_cpus()} CPUs available")
+    print(f"{'route':<22} {'workers':>7} {'req':>8} {'err':>5} {'req/s':>9} {'speedup':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for route in args.routes:
+        single = None
+        for workers in worker_counts:
+            r = run(args.server, workers, route, args)
+            single = single or r["throughput_rps"]
+            speedup = r["throughput_rps"] / single if single else 0
+            print(f"{route:<22} {workers:>7} {r['requests']:>8} {r['errors']:>5} {r['throughput_rps']:>9} "
+                  f"{speedup:>7.2f}x {r['p50_ms']:>9} {r['p99_ms']:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Compares FastAPI's standard response path with FAST_SERIALIZATION.
+
+Two parts:
+  * encoder: the serialization step alone, per representative payload. "standard" is what
+    FastAPI does for a handler result with a response_model (validate, then encode with
+    pydantic); "fast" is app.services.serialization.dumps on the already built model or dict.
+  * routes: the load test's read routes end to end, with the setting off and then on.
+
+Usage (from the repository root):
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --requests 2000 --skip-routes
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import os
+import sys
+import timeit
+
+ROUTES = ["GET /student/plan", "GET /admin/users", "GET /admin/users/{id}", "POST /student/feedback"]
+
+
+def payloads() -> dict:
+    from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+    from app.models.student import PlanInDB
+    from app.models.user import UserPage, UserPublic
+
+    plan = {
+        "id": "plan", "user_id": "user", "week": 1, "theme": "Greetings", "goals": ["Speak", "Listen"],
+        "activities": [{"type": "Video", "title": "Intro", "duration": "10 min"}] * 4, "focusAreas": ["Vocabulary"],
+    }
+    created_at = DatetimeWithNanoseconds(2024, 1, 1, 12, 30, tzinfo=datetime.timezone.utc) # As read from Firestore
+    user_details = {
+        "id": "user", "email": "student@example.com", "name": "Student", "registrationDate": 1700000000000,
+        "emailVerified": True, "goals": ["Speak"], "struggles": "Listening", "degraded": [],
+        "latestPlan": {"id": "plan", "week": 1, "theme": "Greetings"}, "planStatus": "Active",
+        "feedbackHistory": [
+            {"id": str(i), "plan_id": "plan", "rating": 4, "comments": "ok", "created_at": created_at} for i in range(5)
+        ],
+    }
+    users = [{"id": str(i), "email": f"student{i}@example.com", "name": f"Student {i}"} for i in range(100)]
+
+    # (response_model, build the handler result the standard way, build it the fast way)
+    return {
+        "plan": (PlanInDB, lambda: PlanInDB(**plan), lambda: PlanInDB(**plan)),
+        "user details": (dict, lambda: user_details, lambda: user_details),
+        "user page (100)": (
+            UserPage,
+            lambda: UserPage(users=[UserPublic(**user) for user in users]),
+            lambda: UserPage(users=[UserPublic.model_construct(**user) for user in users]),
+        ),
+    }
+
+
+def run_encoder(number: int):
+    from pydantic import TypeAdapter
+    from app.services.serialization import dumps
+
+    print(f"{'payload':<18} {'standard us':>12} {'fast us':>10} {'speedup':>8}")
+    for name, (response_model, build_standard, build_fast) in payloads().items():
+        adapter = TypeAdapter(response_model)
+        standard = lambda: adapter.dump_json(adapter.validate_python(build_standard()))
+        fast = lambda: dumps(build_fast())
+        standard_us = timeit.timeit(standard, number=number) / number * 1e6
+        fast_us = timeit.timeit(fast, number=number) / number * 1e6
+        print(f"{name:<18} {standard_us:>12.1f} {fast_us:>10.1f} {standard_us / fast_us:>7.1f}x")
+
+
+async def run_routes(requests: int, concurrency: int, users: int):
+    import httpx
+    from app import config
+    from app.main import app
+    from benchmarks.load_test import print_table, run_route, setup
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ctx = await setup(client, users)
+        for fast in (False, True):
+            config.FAST_SERIALIZATION = fast # Read per request, so it can be flipped in-process
+            results = {}
+            with contextlib.redirect_stdout(io.StringIO()):
+                for route in ROUTES:
+                    await run_route(client, ctx, route, requests // 10, concurrency) # Warm-up
+                    results[route] = await run_route(client, ctx, route, requests, concurrency)
+            print(f"\nFAST_SERIALIZATION={'true' if fast else 'false'}")
+            print_table(results)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Standard vs fast response serialization.")
+    parser.add_argument("--number", type=int, default=2000, help="Iterations per encoder measurement")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent in-flight requests")
+    parser.add_argument("--users", type=int, default=100, help="Students created during setup")
+    parser.add_argument("--skip-routes", action="store_true", help="Only run the encoder comparison")
+    args = parser.parse_args(argv)
+
+    # Must be set before the app is imported: the storage backend is chosen from the environment
+    os.environ["STORAGE_BACKEND"] = "memory"
+    # A few benchmark users send every request, which the per-user admission limits would mostly shed
+    os.environ.setdefault("ADMISSION_ENABLED", "false")
+    run_encoder(args.number)
+    if not args.skip_routes:
+        asyncio.run(run_routes(args.requests, args.concurrency, args.users))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())